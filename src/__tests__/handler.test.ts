@@ -0,0 +1,91 @@
+const makeRequest = jest.fn();
+
+jest.mock('@jupyterlab/services', () => {
+  return {
+    __esModule: true,
+    ServerConnection: {
+      makeSettings: () => ({ baseUrl: 'http://localhost/' }),
+      makeRequest: (...args: any[]) => makeRequest(...args),
+      NetworkError: Error,
+      ResponseError: Error
+    }
+  };
+});
+
+type Handler = typeof import('../handler');
+
+let requestAPI: Handler['requestAPI'];
+let MAX_CACHED_RESPONSES: Handler['MAX_CACHED_RESPONSES'];
+
+function mockResponse(status: number, body: string, etag: string | null) {
+  return {
+    status: status,
+    ok: status >= 200 && status < 300,
+    headers: { get: (_name: string) => etag },
+    text: () => Promise.resolve(body)
+  };
+}
+
+describe('requestAPI', () => {
+  beforeEach(() => {
+    makeRequest.mockReset();
+    // a fresh module for every test, so that no responses are cached yet
+    jest.isolateModules(() => {
+      // eslint-disable-next-line @typescript-eslint/no-var-requires
+      ({ requestAPI, MAX_CACHED_RESPONSES } = require('../handler'));
+    });
+  });
+
+  it('sends the stored ETag and reuses the data on 304', async () => {
+    makeRequest
+      .mockResolvedValueOnce(mockResponse(200, '{"jobs": [1]}', '"abc"'))
+      .mockResolvedValueOnce(mockResponse(304, '', '"abc"'));
+
+    const first = await requestAPI<any>('jobs?site=TEST&page=1');
+    const second = await requestAPI<any>('jobs?site=TEST&page=1');
+
+    expect(second).toBe(first);
+    expect(makeRequest.mock.calls[0][1].headers).toBeUndefined();
+    expect(makeRequest.mock.calls[1][1].headers).toEqual({
+      'If-None-Match': '"abc"'
+    });
+  });
+
+  it('does not send validators for other methods', async () => {
+    makeRequest
+      .mockResolvedValueOnce(mockResponse(200, '{"jobs": []}', '"abc"'))
+      .mockResolvedValueOnce(mockResponse(200, '{"message": ""}', null));
+
+    await requestAPI<any>('jobs');
+    await requestAPI<any>('jobs', { method: 'POST', body: '{}' });
+
+    expect(makeRequest.mock.calls[1][1].headers).toBeUndefined();
+  });
+
+  it('only keeps validators for the polled end points', async () => {
+    makeRequest.mockResolvedValue(
+      mockResponse(200, '{"transfers": []}', '"abc"')
+    );
+
+    await requestAPI<any>('transfers?transfer_url=test');
+    await requestAPI<any>('transfers?transfer_url=test');
+
+    expect(makeRequest.mock.calls[1][1].headers).toBeUndefined();
+  });
+
+  it('drops the least recently used responses', async () => {
+    makeRequest.mockResolvedValue(mockResponse(200, '{"test": []}', '"abc"'));
+
+    for (let i = 0; i <= MAX_CACHED_RESPONSES; i++) {
+      await requestAPI<any>(`job_output?job_url=${i}`);
+    }
+    makeRequest.mockClear();
+    await requestAPI<any>('job_output?job_url=0');
+    await requestAPI<any>(`job_output?job_url=${MAX_CACHED_RESPONSES}`);
+
+    expect(makeRequest.mock.calls[0][1].headers).toBeUndefined();
+    expect(makeRequest.mock.calls[1][1].headers).toEqual({
+      'If-None-Match': '"abc"'
+    });
+  });
+});
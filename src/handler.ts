@@ -2,8 +2,64 @@ import { URLExt } from '@jupyterlab/coreutils';
 
 import { ServerConnection } from '@jupyterlab/services';
 
+type CachedResponse = {
+  etag: string;
+  data: any;
+};
+
+/**
+ * end points polled by the panel, the only ones worth keeping validators for
+ */
+const CONDITIONAL_END_POINTS = ['jobs', 'job_output'];
+
+/**
+ * maximum number of responses kept, the least recently used one is dropped first
+ */
+export const MAX_CACHED_RESPONSES = 32;
+
+/**
+ * validators (ETag) and parsed bodies of the last successful GET responses, by request URL
+ * (a Map iterates in insertion order, so its first key is the least recently used one)
+ */
+const responseCache = new Map<string, CachedResponse>();
+
+function isConditional(endPoint: string): boolean {
+  return CONDITIONAL_END_POINTS.includes(endPoint.split('?')[0]);
+}
+
+function cacheResponse(requestUrl: string, response: CachedResponse): void {
+  responseCache.delete(requestUrl);
+  responseCache.set(requestUrl, response);
+  while (responseCache.size > MAX_CACHED_RESPONSES) {
+    responseCache.delete(responseCache.keys().next().value as string);
+  }
+}
+
+/**
+ * copy the request headers into a plain object, with one header added
+ * (a plain object does not depend on the Headers global of the environment)
+ */
+function withHeader(
+  headers: HeadersInit | undefined,
+  name: string,
+  value: string
+): Record<string, string> {
+  const merged: Record<string, string> = {};
+  if (Array.isArray(headers)) {
+    headers.forEach(([key, val]) => (merged[key] = val));
+  } else if (headers && typeof (headers as Headers).forEach === 'function') {
+    (headers as Headers).forEach((val, key) => (merged[key] = val));
+  } else if (headers) {
+    Object.assign(merged, headers);
+  }
+  merged[name] = value;
+  return merged;
+}
+
 /**
  * Call the API extension
+ * GET requests are sent with the ETag of the previous response (if any), so that unchanged
+ * resources are answered with an empty 304 and served from the parsed previous body.
  *
  * @param endPoint API REST end point for the extension
  * @param init Initial values for the request
@@ -20,6 +76,14 @@ export async function requestAPI<T>(
     'tvb_ext_unicore', // API Namespace
     endPoint
   );
+  const isConditionalGet =
+    (init.method ?? 'GET').toUpperCase() === 'GET' && isConditional(endPoint);
+  const cached = isConditionalGet ? responseCache.get(requestUrl) : undefined;
+  if (cached) {
+    const headers = withHeader(init.headers, 'If-None-Match', cached.etag);
+    // the validators are handled here, keep the browser cache out of the way
+    init = { ...init, headers: headers, cache: 'no-store' };
+  }
   let response: Response;
   console.log('req URL: ', requestUrl);
   try {
@@ -28,6 +92,11 @@ export async function requestAPI<T>(
     throw new ServerConnection.NetworkError(error as any);
   }
 
+  if (response.status === 304 && cached) {
+    cacheResponse(requestUrl, cached);
+    return cached.data;
+  }
+
   let data: any = await response.text();
 
   if (data.length > 0) {
@@ -42,6 +111,13 @@ export async function requestAPI<T>(
     throw new ServerConnection.ResponseError(response, data.message || data);
   }
 
+  const etag = response.headers.get('Etag');
+  if (isConditionalGet && etag) {
+    cacheResponse(requestUrl, { etag: etag, data: data });
+  } else if (isConditionalGet) {
+    responseCache.delete(requestUrl);
+  }
+
   return data;
 }
 
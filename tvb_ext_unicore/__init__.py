@@ -1,5 +1,4 @@
 from ._version import __version__
-from .handlers import setup_handlers
 
 
 
@@ -25,6 +24,8 @@ def _load_jupyter_server_extension(server_app):
     server_app: jupyterlab.labapp.LabApp
         JupyterLab application instance
     """
+    # Imported here so that importing the package (e.g. from a kernel) does not load the server side modules
+    from .handlers import setup_handlers
     setup_handlers(server_app.web_app)
     server_app.log.info("Registered tvb_ext_unicore server extension")
 
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def build_executor(max_workers=DEFAULT_MAX_WORKERS):
+    # type: (int) -> ThreadPoolExecutor
+    """
+    Build the bounded thread pool running the blocking (pyunicore) calls.
+    """
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tvb_ext_unicore')
+
+
+def run_in_context(executor, func, *args):
+    # type: (ThreadPoolExecutor, callable, ...) -> asyncio.Future
+    """
+    Run func(*args) on the executor from the running event loop, in a copy of the current context, so that the
+    correlation id follows the call to the worker thread.
+    """
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(executor, functools.partial(context.run, func, *args))
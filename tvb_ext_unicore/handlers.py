@@ -6,57 +6,150 @@
 #
 
 import os
+import gzip
 import json
+import hashlib
 
 from jupyter_server.base.handlers import APIHandler
 from jupyter_server.utils import url_path_join
 import tornado
 from tornado.web import MissingArgumentError
 
-from tvb_ext_unicore.exceptions import SitesDownException, FileNotExistsException, JobRunningException
-from tvb_ext_unicore.unicore_wrapper.unicore_wrapper import UnicoreWrapper
-from tvb_ext_unicore.logger.builder import get_logger
+from tvb_ext_unicore.exceptions import TVBExtUnicoreException, SitesDownException, FileNotExistsException, \
+    JobRunningException
+from tvb_ext_unicore.logger.builder import get_logger, new_correlation_id, SAMPLING_KEY, JOBS_POLLING
+from tvb_ext_unicore.prefetcher import Prefetcher, jobs_key, job_output_key, JOBS
+from tvb_ext_unicore.single_flight import SingleFlight
+from tvb_ext_unicore.unicore_wrapper.concurrency import SITE_GOVERNOR
+from tvb_ext_unicore.unicore_wrapper.preview import DEFAULT_PREVIEW_ITEMS, DEFAULT_PREVIEW_LINES
 from tvb_ext_unicore.utils import build_response, DownloadStatus
 
 LOGGER = get_logger(__name__)
+GZIP_MIN_LENGTH = 1024
+SITES = 'sites'
+STORAGES = 'storages'
+PREVIEW = 'preview'
+# Identical concurrent queries (several panels, tabs or notebooks) share a single chain of UNICORE calls.
+# All the UNICORE calls run on its thread pool: they may wait for the concurrency limiter of their site, which
+# must never happen on the IOLoop thread.
+SINGLE_FLIGHT = SingleFlight()
 
 
-class SitesHandler(APIHandler):
+def get_unicore_wrapper():
+    """
+    Build an UnicoreWrapper. The import is deferred so that pyunicore is only loaded by the first request.
+    """
+    from tvb_ext_unicore.unicore_wrapper.unicore_wrapper import UnicoreWrapper
+    return UnicoreWrapper()
+
+
+def get_jobs_payload(site, page):
+    all_jobs, message = get_unicore_wrapper().get_jobs(site, page)
+    return {'jobs': [job.to_json() for job in all_jobs], 'message': message}
+
+
+def get_job_output_payload(job_url):
+    return get_unicore_wrapper().get_job_output(job_url)
+
+
+def get_preview_payload(job_url, file_name, preview_params):
+    return get_unicore_wrapper().preview_file(job_url, file_name, **dict(preview_params))
+
+
+def get_sites():
+    return get_unicore_wrapper().get_sites()
+
+
+def get_storages(site):
+    return get_unicore_wrapper().get_storages(site)
+
+
+def get_transfers_payload(transfer_urls):
+    unicore_wrapper = get_unicore_wrapper()
+    transfers = list()
+    errors = dict()
+    for transfer_url in transfer_urls:
+        try:
+            transfers.append(unicore_wrapper.get_transfer(transfer_url).to_json())
+        except TVBExtUnicoreException as e:
+            errors[transfer_url] = e.message
+    return {'transfers': transfers, 'errors': errors, 'message': ''}
+
+
+PREFETCHER = Prefetcher(SINGLE_FLIGHT, get_jobs_payload, get_job_output_payload)
+
+
+class UnicoreAPIHandler(APIHandler):
+    CORRELATION_HEADER = 'X-Correlation-ID'
+
+    async def prepare(self):
+        """
+        Assign a correlation id to the current request. It is attached to every log line and UNICORE call
+        triggered while serving it, and sent back to the client.
+        """
+        correlation_id = new_correlation_id(self.request.headers.get(self.CORRELATION_HEADER))
+        self.set_header(self.CORRELATION_HEADER, correlation_id)
+        await super().prepare()
+
+    def finish_json(self, payload):
+        """
+        Send the payload as JSON with a stable ETag computed from its serialization. Answers 304 Not Modified
+        when the client already holds this representation (If-None-Match) and gzips large bodies when accepted.
+        """
+        body = json.dumps(payload, sort_keys=True).encode('utf-8')
+        gzipped = len(body) >= GZIP_MIN_LENGTH and 'gzip' in self.request.headers.get('Accept-Encoding', '')
+        etag = hashlib.sha1(body).hexdigest()
+        # Representations with different content encodings must not share a (strong) validator
+        self.set_header('Etag', f'"{etag}-gzip"' if gzipped else f'"{etag}"')
+        self.set_header('Vary', 'Accept-Encoding')
+        self.set_header('Content-Type', 'application/json')
+        if self.check_etag_header():
+            self.set_status(304)
+            self.finish()
+            return
+
+        if gzipped:
+            self.set_header('Content-Encoding', 'gzip')
+            body = gzip.compress(body, compresslevel=6)
+        self.finish(body)
+
+
+class SitesHandler(UnicoreAPIHandler):
     @tornado.web.authenticated
-    def get(self):
+    async def get(self):
         LOGGER.info("Retrieving sites...")
         message = ''
         try:
-            sites = UnicoreWrapper().get_sites()
+            sites = await SINGLE_FLIGHT.run((SITES,), get_sites)
         except SitesDownException as e:
             sites = list()
             message = e.message
         self.finish(json.dumps({'sites': sites, 'message': message}))
 
 
-class JobsHandler(APIHandler):
+class JobsHandler(UnicoreAPIHandler):
     # The following decorator should be present on all verb methods (head, get, post,
     # patch, put, delete, options) to ensure only authorized user can request the
     # Jupyter server
     @tornado.web.authenticated
-    def get(self):
+    async def get(self):
         """
         Retrieve all jobs for current user, launched at site given as POST param.
         """
         try:
             site = self.get_argument("site")
             page = int(self.get_argument("page", "0")) - 1
-            LOGGER.info(f"Retrieving jobs (page {page}) for site {site}...")
+            LOGGER.info(f"Retrieving jobs (page {page}) for site {site}...", extra={SAMPLING_KEY: JOBS_POLLING})
         except MissingArgumentError:
             site = 'DAINT-CSCS'
             LOGGER.warn(f"No site has been found in query params, defaulting to {site}...")
 
-        all_jobs, message = UnicoreWrapper().get_jobs(site, page)
-
-        self.finish(json.dumps({'jobs': [job.to_json() for job in all_jobs], 'message': message}))
+        payload = await SINGLE_FLIGHT.run(jobs_key(site, page), get_jobs_payload, site, page)
+        self.finish_json(payload)
+        PREFETCHER.after_jobs_page(site, page, payload)
 
     @tornado.web.authenticated
-    def post(self):
+    async def post(self):
         """
         Cancel the job corresponding to the id sent as post param.
         """
@@ -64,7 +157,8 @@ class JobsHandler(APIHandler):
         job_url = post_params["resource_url"]
 
         LOGGER.info(f"Cancelling job at URL: {job_url}")
-        is_canceled, job = UnicoreWrapper().cancel_job(job_url)
+        is_canceled, job = await SINGLE_FLIGHT.call(lambda: get_unicore_wrapper().cancel_job(job_url))
+        SINGLE_FLIGHT.forget(JOBS)
 
         if not is_canceled:
             resp = {'message': 'Job could not be cancelled!'}
@@ -74,26 +168,165 @@ class JobsHandler(APIHandler):
         self.finish(json.dumps(resp))
 
 
-class JobOutputHandler(APIHandler):
+class JobOutputHandler(UnicoreAPIHandler):
     @tornado.web.authenticated
-    def get(self):
+    async def get(self):
         """
         Retrieve the output files corresponding to the job_url given as POST param.
         """
         try:
             job_url = self.get_argument("job_url")
-            LOGGER.info(f'Getting job output at url: {job_url}')
-            output = UnicoreWrapper().get_job_output(f'{job_url}')
-            self.finish(json.dumps(output))
         except MissingArgumentError:
             self.set_status(400)
             self.finish(json.dumps({'message': 'Cannot access job outputs: No job url provided!'}))
+            return
+
+        LOGGER.info(f'Getting job output at url: {job_url}')
+        output = await SINGLE_FLIGHT.run(job_output_key(job_url), get_job_output_payload, job_url)
+        self.finish_json(output)
+
+
+class PreviewHandler(UnicoreAPIHandler):
+    @tornado.web.authenticated
+    async def get(self):
+        """
+        Preview the output file given as 'file' param of the job at 'job_url', using ranged reads only.
+        Optional params: 'dataset' (HDF5), 'start' and 'count' (npy/HDF5), 'lines' and 'tail' (text).
+        """
+        try:
+            job_url = self.get_argument("job_url")
+            file_name = self.get_argument("file")
+            preview_params = {'dataset': self.get_argument("dataset", None),
+                              'start': int(self.get_argument("start", "0")),
+                              'count': int(self.get_argument("count", str(DEFAULT_PREVIEW_ITEMS))),
+                              'lines': int(self.get_argument("lines", str(DEFAULT_PREVIEW_LINES))),
+                              'tail': self.get_argument("tail", "false").lower() == "true"}
+        except (MissingArgumentError, ValueError) as e:
+            self.set_status(400)
+            self.finish(json.dumps({'message': f'Cannot preview job output: {e}'}))
+            return
+
+        if min(preview_params['start'], preview_params['count'], preview_params['lines']) < 0:
+            self.set_status(400)
+            self.finish(json.dumps({'message': 'Cannot preview job output: start, count and lines cannot be '
+                                               'negative!'}))
+            return
+
+        LOGGER.info(f'Previewing {file_name} of job at url: {job_url}')
+        preview_params = tuple(sorted(preview_params.items()))
+        try:
+            preview = await SINGLE_FLIGHT.run((PREVIEW, job_url, file_name, preview_params), get_preview_payload,
+                                              job_url, file_name, preview_params)
+        except TVBExtUnicoreException as e:
+            LOGGER.warning(e)
+            self.set_status(400)
+            self.finish(json.dumps({'message': e.message}))
+            return
+        self.finish(json.dumps(preview))
+
+
+class StoragesHandler(UnicoreAPIHandler):
+    @tornado.web.authenticated
+    async def get(self):
+        """
+        Retrieve the storages of the site given as GET param, usable as targets of server-to-server transfers.
+        """
+        try:
+            site = self.get_argument("site")
+        except MissingArgumentError:
+            self.set_status(400)
+            self.finish(json.dumps({'message': 'Cannot access storages: No site provided!'}))
+            return
+
+        LOGGER.info(f"Retrieving storages for site {site}...")
+        try:
+            storages = await SINGLE_FLIGHT.run((STORAGES, site), get_storages, site)
+            message = ''
+        except (AttributeError, TVBExtUnicoreException) as e:
+            LOGGER.warning(e)
+            storages, message = dict(), f'Cannot access storages of {site}!'
+        self.finish(json.dumps({'storages': storages, 'message': message}))
+
+
+class TransfersHandler(UnicoreAPIHandler):
+    @tornado.web.authenticated
+    async def get(self):
+        """
+        Retrieve the status and progress of the server-to-server transfers given as 'transfer_url' GET params.
+        """
+        transfer_urls = self.get_arguments("transfer_url")
+        self.finish_json(await SINGLE_FLIGHT.call(get_transfers_payload, transfer_urls))
+
+    @tornado.web.authenticated
+    async def post(self):
+        """
+        Start server-to-server transfers of the 'files' of the job at 'job_url' to the 'target' folder URL,
+        with an optional 'protocol', given as POST params.
+        """
+        post_params = self.get_json_body()
+        try:
+            job_url = post_params['job_url']
+            file_names = post_params['files']
+            target_url = post_params['target']
+        except KeyError as e:
+            LOGGER.error(e)
+            self.set_status(400, 'Request body missing required params!')
+            self.finish()
+            return
+
+        if not isinstance(file_names, list) or not all(isinstance(file_name, str) for file_name in file_names):
+            self.set_status(400)
+            self.finish(json.dumps({'message': 'Cannot start transfers: files must be a list of file names!'}))
+            return
+
+        try:
+            transfers, errors = await SINGLE_FLIGHT.call(
+                lambda: get_unicore_wrapper().start_transfers(job_url, file_names, target_url,
+                                                              post_params.get('protocol')))
+            message = f'{len(errors)} of {len(file_names)} transfers could not be started!' if errors else ''
+            resp = {'transfers': [transfer.to_json() for transfer in transfers], 'errors': errors,
+                    'message': message}
+        except (FileNotExistsException, JobRunningException) as e:
+            LOGGER.warning(e)
+            resp = {'transfers': [], 'errors': dict(), 'message': e.message}
+        self.finish(json.dumps(resp))
+
+    @tornado.web.authenticated
+    async def delete(self):
+        """
+        Abort the server-to-server transfer given as 'transfer_url' param.
+        """
+        try:
+            transfer_url = self.get_argument("transfer_url")
+        except MissingArgumentError:
+            self.set_status(400)
+            self.finish(json.dumps({'message': 'Cannot abort transfer: No transfer url provided!'}))
+            return
+
+        LOGGER.info(f"Aborting transfer at URL: {transfer_url}")
+        try:
+            transfer = await SINGLE_FLIGHT.call(lambda: get_unicore_wrapper().abort_transfer(transfer_url))
+            resp = {'transfer': transfer.to_json(), 'message': ''}
+        except TVBExtUnicoreException as e:
+            resp = {'transfer': None, 'message': e.message}
+        self.finish(json.dumps(resp))
+
+
+class MetricsHandler(UnicoreAPIHandler):
+    @tornado.web.authenticated
+    def get(self):
+        """
+        Report how many UNICORE calls were saved by sharing identical queries and prefetching, and the current
+        concurrency limit of every site.
+        """
+        self.finish(json.dumps({'single_flight': SINGLE_FLIGHT.metrics, 'prefetch': PREFETCHER.metrics,
+                                'concurrency': SITE_GOVERNOR.metrics}))
 
 
-class DriveHandler(APIHandler):
+class DriveHandler(UnicoreAPIHandler):
 
     @tornado.web.authenticated
-    def post(self, *args):
+    async def post(self, *args):
         """
         Takes care of downloading at the currently selected 'path' the given 'file' generated by the job corresponding
         to the 'job_url' and 'job_id' given as POST params.
@@ -117,9 +350,9 @@ class DriveHandler(APIHandler):
             return
 
         try:
-            unicore_wrapper = UnicoreWrapper()
             drive_file_path = os.path.join(path, drive_file)
-            message = unicore_wrapper.download_file(job_url, unicore_file, drive_file_path)
+            message = await SINGLE_FLIGHT.call(
+                lambda: get_unicore_wrapper().download_file(job_url, unicore_file, drive_file_path))
             response = build_response(DownloadStatus.SUCCESS, message)
         except FileNotExistsException as e:
             LOGGER.error(e)
@@ -138,11 +371,19 @@ def setup_handlers(web_app):
     sites_pattern = url_path_join(base_url, "tvb_ext_unicore", "sites")
     jobs_pattern = url_path_join(base_url, "tvb_ext_unicore", "jobs")
     output_pattern = url_path_join(base_url, "tvb_ext_unicore", "job_output")
+    preview_pattern = url_path_join(base_url, "tvb_ext_unicore", "preview")
+    metrics_pattern = url_path_join(base_url, "tvb_ext_unicore", "metrics")
+    storages_pattern = url_path_join(base_url, "tvb_ext_unicore", "storages")
+    transfers_pattern = url_path_join(base_url, "tvb_ext_unicore", "transfers")
     drive_pattern = url_path_join(base_url, "tvb_ext_unicore", r"drive/([^/]+)?/([^/]+)?")
     handlers = [
         (jobs_pattern, JobsHandler),
         (sites_pattern, SitesHandler),
         (output_pattern, JobOutputHandler),
+        (preview_pattern, PreviewHandler),
+        (metrics_pattern, MetricsHandler),
+        (storages_pattern, StoragesHandler),
+        (transfers_pattern, TransfersHandler),
         (drive_pattern, DriveHandler)
     ]
     web_app.add_handlers(host_pattern, handlers)
@@ -6,10 +6,96 @@
 #
 
 import os
+import atexit
 import inspect
+import itertools
+import queue
+import uuid
 import weakref
 import logging
 import logging.config
+import logging.handlers
+import threading
+from collections import defaultdict
+from contextvars import ContextVar
+
+CORRELATION_ID = 'correlation_id'
+SAMPLING_KEY = 'sampling_key'
+JOBS_POLLING = 'jobs_polling'
+# Keep one record out of N for the given sampling keys, unless overwritten by the 'logSampling' user setting
+DEFAULT_SAMPLING_RATES = {JOBS_POLLING: 10}
+NO_CORRELATION_ID = '-'
+
+_correlation_id = ContextVar(CORRELATION_ID, default=NO_CORRELATION_ID)
+
+
+def new_correlation_id(value=None):
+    # type: (str) -> str
+    """
+    Set the correlation id of the current context (e.g. the request being served) and return it.
+    """
+    value = value or uuid.uuid4().hex[:12]
+    _correlation_id.set(value)
+    return value
+
+
+def get_correlation_id():
+    # type: () -> str
+    return _correlation_id.get()
+
+
+class CorrelationIdFilter(logging.Filter):
+    """
+    Attach the correlation id of the current context to the records that do not have one yet.
+    """
+
+    def filter(self, record):
+        if not hasattr(record, CORRELATION_ID):
+            setattr(record, CORRELATION_ID, get_correlation_id())
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only one record out of N for records logged with a sampling key (extra={SAMPLING_KEY: key}).
+    Every logging call site is sampled on its own, so that the lines logged together for one event are all kept
+    once in a while. Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rates):
+        # type: (dict) -> None
+        super().__init__()
+        self.rates = {key: int(rate) for key, rate in rates.items() if int(rate) > 1}
+        self._counters = defaultdict(itertools.count)
+
+    def filter(self, record):
+        key = getattr(record, SAMPLING_KEY, None)
+        if key not in self.rates or record.levelno >= logging.WARNING:
+            return True
+        return next(self._counters[(key, record.pathname, record.lineno)]) % self.rates[key] == 0
+
+
+class _DeferredConfigHandler(logging.Handler):
+    """
+    Placeholder handler attached to the package logger until the logging configuration is applied.
+    The first record reaching it triggers the configuration and is then re-dispatched to the configured handlers.
+    """
+
+    def __init__(self, builder):
+        super().__init__()
+        self.builder = builder
+
+    def handle(self, record):
+        try:
+            self.builder.configure()
+        except Exception:
+            self.handleError(record)
+            return False
+        logging.getLogger(record.name).handle(record)
+        return True
+
+    def emit(self, record):
+        pass
 
 
 class LoggerBuilder(object):
@@ -17,7 +103,12 @@ class LoggerBuilder(object):
     Class taking care of uniform Python logger initialization.
     It uses the Python native logging package.
     It's purpose is just to offer a common mechanism for initializing all modules in a package.
+    The configuration file is only applied (and the log file opened) when the first record is logged,
+    so that importing the package stays cheap for Jupyter servers and kernels that never use it.
+    The configured handlers are then fed through a queue by a background thread, so that a slow file system
+    never blocks the thread emitting the records (usually the server IOLoop).
     """
+    PACKAGE_LOGGER = 'tvb_ext_unicore'
 
     def __init__(self, config_file_name='logging.conf'):
         """
@@ -25,13 +116,78 @@ class LoggerBuilder(object):
         :param: config_file_name - name of the logging configuration relative to the current package
         """
         current_folder = os.path.dirname(inspect.getfile(self.__class__))
-        config_file_path = os.path.join(current_folder, config_file_name)
+        self._config_file_path = os.path.join(current_folder, config_file_name)
+        self._configured = False
+        self._lock = threading.Lock()
+        self._listener = None
+        self._loggers = weakref.WeakValueDictionary()
 
-        home_directory = os.path.expanduser('~')
-        log_file_path = os.path.join(home_directory, '.tvb_ext_unicore.log')
+        package_logger = logging.getLogger(self.PACKAGE_LOGGER)
+        package_logger.setLevel(logging.INFO)
+        package_logger.addHandler(_DeferredConfigHandler(self))
+        package_logger.propagate = False
 
-        logging.config.fileConfig(config_file_path, disable_existing_loggers=False, defaults={'logfilename': log_file_path})
-        self._loggers = weakref.WeakValueDictionary()
+    def configure(self):
+        """
+        Apply the logging configuration file. Safe to call several times, only the first call has an effect.
+        """
+        if self._configured:
+            return
+        with self._lock:
+            if self._configured:
+                return
+            home_directory = os.path.expanduser('~')
+            log_file_path = os.path.join(home_directory, '.tvb_ext_unicore.log')
+
+            logging.config.fileConfig(self._config_file_path, disable_existing_loggers=False,
+                                      defaults={'logfilename': log_file_path})
+            self._start_queue_listener()
+            self._configured = True
+
+    def _start_queue_listener(self):
+        """
+        Move the handlers created from the configuration file behind a single queue handler.
+        """
+        configured_loggers = [logging.getLogger(), logging.getLogger(self.PACKAGE_LOGGER)]
+        target_handlers = list()
+        for logger in configured_loggers:
+            for handler in logger.handlers:
+                if handler not in target_handlers:
+                    handler.addFilter(CorrelationIdFilter())
+                    target_handlers.append(handler)
+
+        records_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(records_queue)
+        queue_handler.addFilter(CorrelationIdFilter())
+        queue_handler.addFilter(SamplingFilter(self._get_sampling_rates()))
+        for logger in configured_loggers:
+            # Update the handlers in place, the record which triggered the configuration may be dispatched over them
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+            logger.addHandler(queue_handler)
+
+        self._listener = logging.handlers.QueueListener(records_queue, *target_handlers, respect_handler_level=True)
+        self._listener.start()
+        atexit.register(self.stop)
+
+    @staticmethod
+    def _get_sampling_rates():
+        # Imported here as utils needs a logger itself
+        from tvb_ext_unicore.utils import get_user_settings
+        rates = dict(DEFAULT_SAMPLING_RATES)
+        try:
+            rates.update(get_user_settings().get('logSampling', {}))
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not read the log sampling settings: {e}")
+        return rates
+
+    def stop(self):
+        """
+        Flush the queued records and stop the background writer thread.
+        """
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
 
     def build_logger(self, parent_module):
         """
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import asyncio
+from collections import defaultdict, deque, OrderedDict
+
+from tvb_ext_unicore.logger.builder import get_logger
+from tvb_ext_unicore.unicore_wrapper.job_dto import JOBS_PER_PAGE, FINISHED_STATUSES
+from tvb_ext_unicore.utils import get_user_settings
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_PREFETCH_BUDGET = 10
+BUDGET_WINDOW = 60
+# The panel reloads the jobs every 60 seconds, a prefetched page is not worth more
+JOBS_PAGE_TTL = 60
+# The working directory of a finished job does not change anymore
+JOB_OUTPUT_TTL = 600
+MAX_TRACKED_JOBS = 1000
+JOBS = 'jobs'
+JOB_OUTPUT = 'job_output'
+
+
+def jobs_key(site, page):
+    return JOBS, site, page
+
+
+def job_output_key(job_url):
+    return JOB_OUTPUT, job_url
+
+
+class Prefetcher(object):
+    """
+    Speculatively fetch the queries the user is likely to issue next, and keep their results in the SingleFlight
+    result window so that the next click is answered from memory:
+        - after serving a full page of jobs, the next page of the same site, unless the same page with the same
+          jobs has already led to it (the panel polls its current page, which must not double the upstream calls);
+        - when a job is seen moving to a finished status, the listing of its working directory.
+    Prefetching is bounded by a budget of upstream calls per site and per minute, and can be disabled with the
+    'prefetch' user setting.
+    """
+
+    def __init__(self, single_flight, fetch_jobs, fetch_job_output, enabled=None, budget_per_site=None):
+        # type: (SingleFlight, callable, callable, bool, int) -> None
+        """
+        :param fetch_jobs: blocking function (site, page) -> jobs payload, as served by the jobs endpoint
+        :param fetch_job_output: blocking function (job_url) -> job output listing
+        """
+        self.single_flight = single_flight
+        self.fetch_jobs = fetch_jobs
+        self.fetch_job_output = fetch_job_output
+        self._enabled = enabled
+        self._budget_per_site = budget_per_site
+        self._site_calls = defaultdict(deque)
+        self._job_statuses = OrderedDict()
+        # site -> (page, jobs signature) of the page whose next page has been prefetched last
+        self._prefetched_after = dict()
+        self._metrics = {'scheduled': 0, 'over_budget': 0}
+
+    def _load_settings(self):
+        if self._enabled is None or self._budget_per_site is None:
+            settings = get_user_settings()
+            if self._enabled is None:
+                self._enabled = bool(settings.get('prefetch', True))
+            if self._budget_per_site is None:
+                self._budget_per_site = int(settings.get('prefetchBudget', DEFAULT_PREFETCH_BUDGET))
+
+    @property
+    def metrics(self):
+        # type: () -> dict
+        return dict(self._metrics)
+
+    def _consume_budget(self, site):
+        now = asyncio.get_running_loop().time()
+        calls = self._site_calls[site]
+        while calls and calls[0] <= now - BUDGET_WINDOW:
+            calls.popleft()
+        if len(calls) >= self._budget_per_site:
+            self._metrics['over_budget'] += 1
+            return False
+        calls.append(now)
+        return True
+
+    def _prefetch(self, site, key, ttl, func, *args):
+        # type: (str, tuple, float, callable, ...) -> bool
+        """
+        Returns whether the result for key is now being fetched or already available.
+        """
+        if not self._consume_budget(site):
+            LOGGER.info(f"Prefetch budget of site {site} exhausted, skipping {key}")
+            return False
+        if self.single_flight.prefetch(key, ttl, func, *args):
+            self._metrics['scheduled'] += 1
+        else:
+            # Nothing has been fetched, give the budget back
+            self._site_calls[site].pop()
+        return True
+
+    def after_jobs_page(self, site, page, payload):
+        """
+        Called after serving a page of jobs: prefetch the next page and the outputs of the jobs that just finished.
+        """
+        self._load_settings()
+        if not self._enabled:
+            return
+
+        for job in payload['jobs']:
+            job_url, status = job['resource_url'], job['status']
+            previous_status = self._job_statuses.pop(job_url, None)
+            self._job_statuses[job_url] = status
+            just_finished = previous_status is not None and previous_status not in FINISHED_STATUSES
+            if just_finished and status in FINISHED_STATUSES:
+                self._prefetch(site, job_output_key(job_url), JOB_OUTPUT_TTL, self.fetch_job_output, job_url)
+        while len(self._job_statuses) > MAX_TRACKED_JOBS:
+            self._job_statuses.popitem(last=False)
+
+        if len(payload['jobs']) < JOBS_PER_PAGE:
+            return
+        # The next page only moves when jobs are added, removed or change status on this one
+        signature = page, tuple((job['resource_url'], job['status']) for job in payload['jobs'])
+        if self._prefetched_after.get(site) == signature:
+            return
+        if self._prefetch(site, jobs_key(site, page + 1), JOBS_PAGE_TTL, self.fetch_jobs, site, page + 1):
+            self._prefetched_after[site] = signature
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import asyncio
+import functools
+
+from tvb_ext_unicore.executor import DEFAULT_MAX_WORKERS, build_executor, run_in_context
+from tvb_ext_unicore.logger.builder import get_logger
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_RESULT_TTL = 2
+
+
+class SingleFlight(object):
+    """
+    Coalesce identical concurrent calls: while a call for a given key is in flight, other callers asking for the same
+    key wait for it and share its result instead of triggering their own upstream call. Successful results are also
+    shared for a short window (result_ttl seconds) after the call completes, or longer for prefetched results.
+    The blocking calls are run on a thread pool, so the server IOLoop stays free meanwhile; call() runs the calls
+    which must not be shared on the same pool. Must be used from the IOLoop thread only.
+    """
+
+    def __init__(self, result_ttl=DEFAULT_RESULT_TTL, max_workers=DEFAULT_MAX_WORKERS):
+        # type: (float, int) -> None
+        self.result_ttl = result_ttl
+        self._executor = build_executor(max_workers)
+        self._in_flight = dict()
+        self._results = dict()
+        # In-flight calls started before a forget, their results must not be shared
+        self._stale_calls = set()
+        self._metrics = {'requests': 0, 'upstream_calls': 0, 'coalesced': 0, 'served_from_window': 0,
+                         'prefetched': 0, 'prefetch_hits': 0}
+
+    @property
+    def metrics(self):
+        # type: () -> dict
+        metrics = dict(self._metrics)
+        metrics['saved_calls'] = metrics['coalesced'] + metrics['served_from_window']
+        metrics['in_flight'] = len(self._in_flight)
+        return metrics
+
+    async def run(self, key, func, *args):
+        """
+        Return the result of func(*args), sharing it with the identical calls (same key) in flight or just finished.
+        """
+        self._metrics['requests'] += 1
+        loop = asyncio.get_running_loop()
+
+        if key in self._results:
+            expiry, result, prefetched = self._results[key]
+            now = loop.time()
+            if now < expiry:
+                self._metrics['served_from_window'] += 1
+                if prefetched:
+                    # A prefetched result answers the click it was fetched for, later requests need fresh data
+                    self._metrics['prefetch_hits'] += 1
+                    self._results[key] = (min(expiry, now + self.result_ttl), result, False)
+                return result
+            del self._results[key]
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            LOGGER.info(f"Joining the in-flight call for {key}")
+            self._metrics['coalesced'] += 1
+        else:
+            self._metrics['upstream_calls'] += 1
+            future = self._start_call(loop, key, self.result_ttl, func, *args)
+
+        # A cancelled caller must not cancel the call shared with the others
+        return await asyncio.shield(future)
+
+    async def call(self, func, *args):
+        """
+        Run func(*args) on the thread pool without sharing it, for the calls that change something upstream or whose
+        result is specific to the caller.
+        """
+        return await run_in_context(self._executor, func, *args)
+
+    def prefetch(self, key, ttl, func, *args):
+        # type: (tuple, float, callable, ...) -> bool
+        """
+        Start func(*args) in the background, unless the result for key is already available or in flight, and keep
+        its result for ttl seconds. Returns whether a call has been started.
+        """
+        loop = asyncio.get_running_loop()
+        if key in self._in_flight or (key in self._results and loop.time() < self._results[key][0]):
+            return False
+        LOGGER.info(f"Prefetching {key}")
+        self._metrics['prefetched'] += 1
+        self._start_call(loop, key, ttl, func, *args, prefetched=True)
+        return True
+
+    def _start_call(self, loop, key, ttl, func, *args, prefetched=False):
+        future = run_in_context(self._executor, func, *args)
+        future.add_done_callback(functools.partial(self._call_done, key, ttl, prefetched))
+        self._in_flight[key] = future
+        return future
+
+    def _call_done(self, key, ttl, prefetched, future):
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+        stale = future in self._stale_calls
+        self._stale_calls.discard(future)
+        now = asyncio.get_running_loop().time()
+        for expired_key in [cached_key for cached_key, (expiry, _, _) in self._results.items() if expiry <= now]:
+            del self._results[expired_key]
+        if future.cancelled() or future.exception() is not None:
+            if prefetched:
+                LOGGER.warning(f"Prefetching {key} did not complete")
+            return
+        if ttl > 0 and not stale:
+            self._results[key] = (now + ttl, future.result(), prefetched)
+
+    def forget(self, kind):
+        """
+        Drop the shared results whose key starts with the given kind, e.g. after a change made by the user.
+        The calls of that kind still in flight are not joined anymore, and their results are not kept.
+        """
+        for key in [key for key in self._results if key[0] == kind]:
+            del self._results[key]
+        for key in [key for key in self._in_flight if key[0] == kind]:
+            self._stale_calls.add(self._in_flight.pop(key))
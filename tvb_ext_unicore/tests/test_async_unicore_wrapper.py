@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import time
+import pytest
+import requests
+
+from tvb_ext_unicore.exceptions import FileNotExistsException
+from tvb_ext_unicore.unicore_wrapper.async_unicore_wrapper import AsyncUnicoreWrapper
+from tvb_ext_unicore.unicore_wrapper.unicore_wrapper import DOWNLOAD_MESSAGE
+
+
+class MockUnicoreWrapper(object):
+    def __init__(self, statuses=None):
+        # job_url -> list of statuses returned by consecutive polls
+        self.statuses = statuses or {}
+        self.polls = 0
+
+    def get_jobs(self, site, page=0):
+        if site == 'DOWN':
+            raise requests.ConnectionError('Site unreachable')
+        return [f'{site}-job-{page}'], ''
+
+    def download_file(self, job_url, file_name, path=None):
+        if file_name == 'missing':
+            raise FileNotExistsException(f'{file_name} does not exist as output of {job_url}!')
+        time.sleep(0.05 if file_name == 'slow' else 0)
+        return DOWNLOAD_MESSAGE
+
+    def get_job_status(self, job_url):
+        self.polls += 1
+        statuses = self.statuses[job_url]
+        status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        if isinstance(status, Exception):
+            raise status
+        return status
+
+    def get_job(self, job_url):
+        return job_url
+
+
+@pytest.fixture
+def mock_from_unicore_job(mocker):
+    mocker.patch('tvb_ext_unicore.unicore_wrapper.job_dto.JobDTO.from_unicore_job', lambda job: job)
+
+
+@pytest.mark.asyncio
+async def test_get_jobs_from_several_sites():
+    async with AsyncUnicoreWrapper(MockUnicoreWrapper()) as unicore:
+        jobs = await unicore.get_jobs(['SITE1', 'SITE2'], page=1)
+
+    assert jobs == {'SITE1': (['SITE1-job-1'], ''), 'SITE2': (['SITE2-job-1'], '')}
+
+
+@pytest.mark.asyncio
+async def test_get_jobs_with_unreachable_site():
+    async with AsyncUnicoreWrapper(MockUnicoreWrapper()) as unicore:
+        jobs = await unicore.get_jobs(['SITE1', 'DOWN'])
+
+    assert jobs['SITE1'] == (['SITE1-job-0'], '')
+    assert jobs['DOWN'] == ([], 'Jobs of DOWN are not available at the moment!')
+
+
+@pytest.mark.asyncio
+async def test_download_files_in_completion_order():
+    files = [('job1', 'slow', None), ('job2', 'missing', None), ('job3', 'fast', None)]
+    async with AsyncUnicoreWrapper(MockUnicoreWrapper()) as unicore:
+        results = [result async for result in unicore.download_files(files, return_exceptions=True)]
+
+    assert [file_name for _, file_name, _ in results][-1] == 'slow'
+    results = {file_name: result for _, file_name, result in results}
+    assert isinstance(results['missing'], FileNotExistsException)
+    assert results['fast'] == DOWNLOAD_MESSAGE
+
+
+@pytest.mark.asyncio
+async def test_download_files_raises():
+    async with AsyncUnicoreWrapper(MockUnicoreWrapper()) as unicore:
+        with pytest.raises(FileNotExistsException):
+            async for _ in unicore.download_files([('job1', 'missing', None)]):
+                pass
+
+
+@pytest.mark.asyncio
+async def test_wait_for_jobs_in_completion_order(mock_from_unicore_job):
+    wrapper = MockUnicoreWrapper({
+        'job1': ['QUEUED', 'RUNNING', 'RUNNING', 'SUCCESSFUL'],
+        'job2': ['RUNNING', 'FAILED'],
+    })
+    async with AsyncUnicoreWrapper(wrapper) as unicore:
+        finished = [job async for job in unicore.wait_for_jobs(['job1', 'job2'], min_interval=0.01)]
+
+    assert finished == ['job2', 'job1']
+    assert wrapper.polls == 6
+
+
+@pytest.mark.asyncio
+async def test_wait_for_jobs_survives_failed_polls(mock_from_unicore_job):
+    overloaded = requests.HTTPError('503 Server Error: Service Unavailable')
+    wrapper = MockUnicoreWrapper({
+        'job1': ['RUNNING', overloaded, 'SUCCESSFUL'],
+        'job2': [overloaded, 'FAILED'],
+    })
+    async with AsyncUnicoreWrapper(wrapper) as unicore:
+        finished = [job async for job in unicore.wait_for_jobs(['job1', 'job2'], min_interval=0.01)]
+
+    assert sorted(finished) == ['job1', 'job2']
+
+
+@pytest.mark.asyncio
+async def test_wait_for_jobs_timeout(mock_from_unicore_job):
+    wrapper = MockUnicoreWrapper({'job1': ['RUNNING']})
+    async with AsyncUnicoreWrapper(wrapper) as unicore:
+        with pytest.raises(TimeoutError):
+            async for _ in unicore.wait_for_jobs(['job1'], min_interval=0.01, timeout=0.05):
+                pass
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import threading
+import time
+
+import pytest
+import requests
+
+from tvb_ext_unicore.unicore_wrapper.concurrency import AdaptiveLimiter, SiteGovernor
+
+
+def call(limiter, latency=0.1, status_code=200, retry_after=None):
+    limiter.acquire()
+    limiter.release(latency, status_code, retry_after)
+
+
+def test_limit_grows_when_saturated():
+    limiter = AdaptiveLimiter(floor=1, ceiling=8, initial_limit=2)
+    for _ in range(2):
+        limiter.acquire()
+    limiter.release(0.1, 200)
+    limiter.release(0.1, 200)
+    assert limiter.limit == 2.5
+
+    # Calls made one by one do not need a higher limit
+    for _ in range(10):
+        call(limiter)
+    assert limiter.limit == 2.5
+
+
+def test_limit_stays_below_ceiling():
+    limiter = AdaptiveLimiter(floor=1, ceiling=3, initial_limit=3)
+    for _ in range(50):
+        for _ in range(3):
+            limiter.acquire()
+        for _ in range(3):
+            limiter.release(0.1, 200)
+    assert limiter.limit == 3
+
+
+def test_backoff_on_overload():
+    for status_code in (429, 503, None):
+        limiter = AdaptiveLimiter(floor=1, ceiling=16, initial_limit=8)
+        call(limiter, status_code=status_code)
+        assert limiter.limit == 4
+        assert limiter.metrics['backoffs'] == 1
+
+
+def test_backoff_once_per_round_and_not_below_floor():
+    limiter = AdaptiveLimiter(floor=2, ceiling=16, initial_limit=8)
+    for _ in range(4):
+        call(limiter, status_code=500)
+    assert limiter.limit == 4
+
+    for _ in range(20):
+        call(limiter, status_code=500)
+    assert limiter.limit == 2
+
+
+def test_client_errors_are_not_overload():
+    limiter = AdaptiveLimiter(floor=1, ceiling=16, initial_limit=8)
+    call(limiter, status_code=404)
+    assert limiter.limit == 8
+
+
+def test_backoff_on_rising_latency():
+    limiter = AdaptiveLimiter(floor=1, ceiling=16, initial_limit=8)
+    for _ in range(20):
+        call(limiter, latency=0.1)
+    assert limiter.limit == 8
+
+    call(limiter, latency=1)
+    assert limiter.limit == 8 * 0.9
+
+
+def test_retry_after_pauses_calls():
+    limiter = AdaptiveLimiter(floor=1, ceiling=16, initial_limit=8)
+    call(limiter, status_code=429, retry_after=0.2)
+
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.15
+    assert limiter.metrics['paused'] == 1
+
+
+def test_acquire_waits_for_a_free_slot():
+    limiter = AdaptiveLimiter(floor=1, ceiling=1, initial_limit=1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def second_call():
+        limiter.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=second_call)
+    thread.start()
+    assert not acquired.wait(timeout=0.1)
+
+    limiter.release(0.1, 200)
+    assert acquired.wait(timeout=1)
+    thread.join()
+    assert limiter.in_flight == 1
+
+
+def test_one_limiter_per_site():
+    governor = SiteGovernor(floor=1, ceiling=4)
+    site_limiter = governor.limiter_for('https://site.example.org:8080/SITE/rest/core/jobs')
+    assert governor.limiter_for('https://site.example.org:8080/SITE/rest/core/storages') is site_limiter
+    assert governor.limiter_for('https://other.example.org/SITE/rest/core/jobs') is not site_limiter
+    # Sites and registry behind the same gateway
+    assert governor.limiter_for('https://site.example.org:8080/OTHER/rest/core/jobs') is not site_limiter
+    assert governor.limiter_for('https://site.example.org:8080/HBP/rest/registries/default') is not site_limiter
+
+    call(site_limiter, status_code=503)
+    metrics = governor.metrics
+    assert metrics['site.example.org:8080/SITE']['limit'] == 2
+    assert metrics['site.example.org:8080/OTHER']['limit'] == 4
+    assert metrics['other.example.org/SITE']['limit'] == 4
+
+
+def test_transport_reports_to_site_limiter(mocker):
+    from tvb_ext_unicore.unicore_wrapper.unicore_wrapper import CorrelatedTransport
+
+    governor = SiteGovernor(floor=1, ceiling=16)
+    mocker.patch('tvb_ext_unicore.unicore_wrapper.unicore_wrapper.SITE_GOVERNOR', governor)
+    transport = CorrelatedTransport('token')
+
+    response = requests.Response()
+    response.status_code = 429
+    response.headers['Retry-After'] = '0'
+    method = mocker.Mock(return_value=response)
+    mocker.patch.object(transport, '_headers', return_value={})
+    mocker.patch.object(transport, 'check_error', side_effect=requests.HTTPError(response=response))
+
+    with pytest.raises(requests.HTTPError):
+        transport.run_method(method, url='https://site.example.org/SITE/rest/core/jobs')
+    limiter = governor.limiter_for('https://site.example.org/SITE/rest/core')
+    assert limiter.in_flight == 0
+    assert limiter.metrics['backoffs'] == 1
+
+
+def test_transport_frees_slot_of_interrupted_call(mocker):
+    from tvb_ext_unicore.unicore_wrapper.unicore_wrapper import CorrelatedTransport
+
+    governor = SiteGovernor(floor=1, ceiling=1)
+    mocker.patch('tvb_ext_unicore.unicore_wrapper.unicore_wrapper.SITE_GOVERNOR', governor)
+    transport = CorrelatedTransport('token')
+    mocker.patch.object(transport, '_headers', return_value={})
+    method = mocker.Mock(side_effect=KeyboardInterrupt)
+
+    with pytest.raises(KeyboardInterrupt):
+        transport.run_method(method, url='https://site.example.org/SITE/rest/core/jobs')
+    limiter = governor.limiter_for('https://site.example.org/SITE/rest/core')
+    assert limiter.in_flight == 0
+    assert limiter.metrics['backoffs'] == 0
+
+    # The slot is available again
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire(), acquired.set()), daemon=True)
+    thread.start()
+    assert acquired.wait(timeout=1)
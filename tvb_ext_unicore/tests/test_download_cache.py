@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import os
+import pytest
+
+from tvb_ext_unicore.unicore_wrapper.download_cache import DownloadCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DownloadCache(cache_dir=str(tmp_path / 'cache'), max_size=10)
+
+
+def write_file(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+    return str(path)
+
+
+def test_build_key_depends_on_signature():
+    key = DownloadCache.build_key('job/url', 'file1', 4, '2022-02-10T10:30:45+0100')
+    assert key == DownloadCache.build_key('job/url', 'file1', 4, '2022-02-10T10:30:45+0100')
+    assert key != DownloadCache.build_key('job/url', 'file1', 5, '2022-02-10T10:30:45+0100')
+    assert key != DownloadCache.build_key('other/url', 'file1', 4, '2022-02-10T10:30:45+0100')
+
+
+def test_get_miss(cache, tmp_path):
+    assert not cache.get('missing', str(tmp_path / 'out'))
+
+
+def test_put_and_get(cache, tmp_path):
+    downloaded = write_file(tmp_path / 'downloaded', b'test')
+    cache.put('key', downloaded)
+
+    out = str(tmp_path / 'out')
+    assert cache.get('key', out, size=4)
+    with open(out, 'rb') as f:
+        assert f.read() == b'test'
+
+
+def test_get_drops_entry_with_wrong_size(cache, tmp_path):
+    cache.put('key', write_file(tmp_path / 'downloaded', b'test'))
+
+    assert not cache.get('key', str(tmp_path / 'out'), size=5)
+    assert not os.path.exists(os.path.join(cache.cache_dir, 'key'))
+
+
+def test_get_drops_entry_written_through_served_file(cache, tmp_path):
+    cache.put('key', write_file(tmp_path / 'downloaded', b'test'))
+    out = str(tmp_path / 'out')
+    assert cache.get('key', out, size=4)
+
+    # Same size in-place write, as done by h5py in 'r+' mode
+    with open(out, 'r+b') as f:
+        f.write(b'TE')
+    os.utime(out, ns=(0, os.stat(out).st_mtime_ns + 1))
+
+    assert not cache.get('key', str(tmp_path / 'other'), size=4)
+    assert not os.path.exists(os.path.join(cache.cache_dir, 'key'))
+
+
+def test_get_keeps_served_file_mtime(cache, tmp_path):
+    downloaded = write_file(tmp_path / 'downloaded', b'test')
+    os.utime(downloaded, (1000, 1000))
+    cache.put('key', downloaded)
+
+    out = str(tmp_path / 'out')
+    assert cache.get('key', out, size=4)
+    assert os.stat(out).st_mtime == 1000
+
+
+def test_entry_evicted_while_served_is_a_miss(cache, tmp_path, mocker):
+    cache.put('key', write_file(tmp_path / 'downloaded', b'test'))
+    out = write_file(tmp_path / 'out', b'user data')
+
+    def evicted_meanwhile(src, dst):
+        os.remove(src)
+        raise FileNotFoundError(src)
+
+    mocker.patch('os.link', evicted_meanwhile)
+    assert not cache.get('key', out, size=4)
+    with open(out, 'rb') as f:
+        assert f.read() == b'user data'
+    assert not any(name.startswith('.tmp-') for name in os.listdir(tmp_path))
+
+
+def test_evict_removes_leftovers(cache, tmp_path):
+    cache.put('key', write_file(tmp_path / 'downloaded', b'test'))
+    orphan_stamp = write_file(os.path.join(cache.cache_dir, 'orphan.stamp'), b'4 0')
+    old_tmp = write_file(os.path.join(cache.cache_dir, '.tmp-old'), b'partial')
+    os.utime(old_tmp, (0, 0))
+    recent_tmp = write_file(os.path.join(cache.cache_dir, '.tmp-recent'), b'partial')
+
+    cache.evict()
+    assert sorted(os.listdir(cache.cache_dir)) == ['.tmp-recent', 'key', 'key.stamp']
+    assert os.path.exists(recent_tmp) and not os.path.exists(orphan_stamp)
+
+
+def test_evicts_least_recently_used(cache, tmp_path):
+    cache.put('old', write_file(tmp_path / 'old', b'1234'))
+    cache.put('new', write_file(tmp_path / 'new', b'5678'))
+    os.utime(os.path.join(cache.cache_dir, 'old.stamp'), (1, 1))
+    cache.put('newest', write_file(tmp_path / 'newest', b'90ab'))
+
+    assert sorted(os.listdir(cache.cache_dir)) == ['new', 'new.stamp', 'newest', 'newest.stamp']
+
+
+def test_disabled_cache(tmp_path):
+    cache = DownloadCache(cache_dir=str(tmp_path / 'cache'), max_size=0)
+    cache.put('key', write_file(tmp_path / 'downloaded', b'test'))
+
+    assert not os.path.exists(cache.cache_dir)
+    assert not cache.get('key', str(tmp_path / 'out'))
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import asyncio
+import gzip
+import json
+import time
+import pytest
+from tornado.httpclient import HTTPClientError
+
+from tvb_ext_unicore.exceptions import TVBExtUnicoreException
+from tvb_ext_unicore.single_flight import SingleFlight
+from tvb_ext_unicore.unicore_wrapper.concurrency import SiteGovernor
+
+GET_UNICORE_WRAPPER = 'tvb_ext_unicore.handlers.get_unicore_wrapper'
+SINGLE_FLIGHT = 'tvb_ext_unicore.handlers.SINGLE_FLIGHT'
+
+
+class MockUnicoreWrapper(object):
+    def __init__(self, outputs):
+        self.outputs = outputs
+
+    def get_job_output(self, job_url):
+        return self.outputs
+
+
+@pytest.fixture
+def mock_outputs(mocker):
+    outputs = {'stdout': {'is_file': True}}
+    mocker.patch(GET_UNICORE_WRAPPER, lambda: MockUnicoreWrapper(outputs))
+    mocker.patch(SINGLE_FLIGHT, SingleFlight(result_ttl=0))
+    return outputs
+
+
+async def test_job_output_not_modified(jp_fetch, mock_outputs):
+    response = await jp_fetch('tvb_ext_unicore', 'job_output', params={'job_url': 'test_url'})
+    etag = response.headers['Etag']
+    assert json.loads(response.body) == mock_outputs
+    assert response.headers['X-Correlation-ID']
+
+    with pytest.raises(HTTPClientError) as e:
+        await jp_fetch('tvb_ext_unicore', 'job_output', params={'job_url': 'test_url'},
+                       headers={'If-None-Match': etag})
+    assert e.value.code == 304
+
+    mock_outputs['stderr'] = {'is_file': True}
+    response = await jp_fetch('tvb_ext_unicore', 'job_output', params={'job_url': 'test_url'},
+                              headers={'If-None-Match': etag})
+    assert response.code == 200
+    assert response.headers['Etag'] != etag
+
+
+async def test_job_output_gzip(jp_fetch, mock_outputs):
+    for i in range(100):
+        mock_outputs[f'output_{i}'] = {'is_file': True}
+
+    response = await jp_fetch('tvb_ext_unicore', 'job_output', params={'job_url': 'test_url'},
+                              headers={'Accept-Encoding': 'gzip'}, decompress_response=False)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.body)) == mock_outputs
+
+
+async def test_metrics(jp_fetch, mock_outputs):
+    await jp_fetch('tvb_ext_unicore', 'job_output', params={'job_url': 'test_url'})
+    response = await jp_fetch('tvb_ext_unicore', 'metrics')
+
+    metrics = json.loads(response.body)['single_flight']
+    assert metrics['upstream_calls'] == 1
+    assert metrics['saved_calls'] == 0
+
+
+async def test_ioloop_responsive_while_site_is_paused(jp_fetch, mocker):
+    governor = SiteGovernor(floor=1, ceiling=4)
+    limiter = governor.limiter_for('https://site.example.org/')
+    limiter.acquire()
+    limiter.release(0.1, 429, retry_after=0.5)
+
+    class PausedSiteWrapper(object):
+        def get_sites(self):
+            # As done by the transport for every UNICORE call
+            limiter.acquire()
+            limiter.release(0.1, 200)
+            return {'SITE': 'https://site.example.org/SITE/rest/core'}
+
+    mocker.patch(GET_UNICORE_WRAPPER, PausedSiteWrapper)
+    mocker.patch(SINGLE_FLIGHT, SingleFlight(result_ttl=0))
+    mocker.patch('tvb_ext_unicore.handlers.SITE_GOVERNOR', governor)
+
+    sites = asyncio.ensure_future(jp_fetch('tvb_ext_unicore', 'sites'))
+    await asyncio.sleep(0.05)
+    start = time.monotonic()
+    response = await jp_fetch('tvb_ext_unicore', 'metrics')
+    assert time.monotonic() - start < 0.3
+    assert json.loads(response.body)['concurrency']['site.example.org']['paused'] == 1
+    assert not sites.done()
+
+    response = await sites
+    assert json.loads(response.body)['sites'] == {'SITE': 'https://site.example.org/SITE/rest/core'}
+
+
+async def test_preview_errors_are_bad_requests(jp_fetch, mocker):
+    class MockPreviewWrapper(object):
+        def preview_file(self, job_url, file_name, **preview_params):
+            raise TVBExtUnicoreException('Not a valid HDF5 file!')
+
+    mocker.patch(GET_UNICORE_WRAPPER, MockPreviewWrapper)
+    mocker.patch(SINGLE_FLIGHT, SingleFlight(result_ttl=0))
+    for params in [{'job_url': 'test_url', 'file': 'result.h5'},
+                   {'job_url': 'test_url', 'file': 'time_series.npy', 'start': '-3'}]:
+        with pytest.raises(HTTPClientError) as e:
+            await jp_fetch('tvb_ext_unicore', 'preview', params=params)
+        assert e.value.code == 400
+
+
+async def test_transfers(jp_fetch, mocker):
+    class MockTransfer(object):
+        def __init__(self, resource_url):
+            self.resource_url = resource_url
+
+        def to_json(self):
+            return {'resource_url': self.resource_url, 'status': 'RUNNING'}
+
+    class MockTransferWrapper(object):
+        def start_transfers(self, job_url, file_names, target_url, protocol=None):
+            transfers = [MockTransfer(f'{target_url}/{file_name}') for file_name in file_names if file_name != 'fail']
+            errors = {file_name: 'Could not start' for file_name in file_names if file_name == 'fail'}
+            return transfers, errors
+
+        def get_transfer(self, transfer_url):
+            if transfer_url == 'unknown':
+                raise TVBExtUnicoreException('Transfer at unknown is not available!')
+            return MockTransfer(transfer_url)
+
+        def abort_transfer(self, transfer_url):
+            return self.get_transfer(transfer_url)
+
+    mocker.patch(GET_UNICORE_WRAPPER, MockTransferWrapper)
+    body = {'job_url': 'test_url', 'files': ['file1', 'fail', 'file2'], 'target': 'storage'}
+    response = await jp_fetch('tvb_ext_unicore', 'transfers', method='POST', body=json.dumps(body))
+    resp = json.loads(response.body)
+    assert [transfer['resource_url'] for transfer in resp['transfers']] == ['storage/file1', 'storage/file2']
+    assert resp['errors'] == {'fail': 'Could not start'}
+    assert resp['message'] == '1 of 3 transfers could not be started!'
+
+    params = [('transfer_url', 'storage/file1'), ('transfer_url', 'unknown')]
+    response = await jp_fetch('tvb_ext_unicore', 'transfers', params=params)
+    resp = json.loads(response.body)
+    assert resp['transfers'] == [{'resource_url': 'storage/file1', 'status': 'RUNNING'}]
+    assert list(resp['errors']) == ['unknown']
+
+    response = await jp_fetch('tvb_ext_unicore', 'transfers', method='DELETE', params={'transfer_url': 'unknown'})
+    assert json.loads(response.body) == {'transfer': None, 'message': 'Transfer at unknown is not available!'}
+
+
+async def test_transfers_files_must_be_a_list(jp_fetch, mocker):
+    mocker.patch(GET_UNICORE_WRAPPER, mocker.Mock())
+    body = {'job_url': 'test_url', 'files': 'file1', 'target': 'storage'}
+    with pytest.raises(HTTPClientError) as e:
+        await jp_fetch('tvb_ext_unicore', 'transfers', method='POST', body=json.dumps(body))
+    assert e.value.code == 400
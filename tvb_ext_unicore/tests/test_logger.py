@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import contextvars
+import logging
+
+from pyunicore.credentials import OIDCToken
+
+from tvb_ext_unicore.logger.builder import CorrelationIdFilter, SamplingFilter, new_correlation_id, \
+    get_correlation_id, NO_CORRELATION_ID, CORRELATION_ID, SAMPLING_KEY
+from tvb_ext_unicore.unicore_wrapper.unicore_wrapper import CorrelatedTransport, CORRELATION_HEADER
+
+
+def build_record(level=logging.INFO, lineno=0, **extra):
+    record = logging.LogRecord('tvb_ext_unicore.test', level, __file__, lineno, 'message', None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def in_new_context(func):
+    return contextvars.copy_context().run(func)
+
+
+def test_correlation_id_is_attached_to_records():
+    def log_in_request():
+        correlation_id = new_correlation_id()
+        record = build_record()
+        CorrelationIdFilter().filter(record)
+        return correlation_id, getattr(record, CORRELATION_ID)
+
+    correlation_id, record_correlation_id = in_new_context(log_in_request)
+    assert record_correlation_id == correlation_id
+    assert get_correlation_id() == NO_CORRELATION_ID
+
+
+def test_correlation_id_filter_keeps_existing_id():
+    record = build_record(**{CORRELATION_ID: 'abc'})
+    CorrelationIdFilter().filter(record)
+    assert getattr(record, CORRELATION_ID) == 'abc'
+
+
+def test_sampling_filter():
+    sampling_filter = SamplingFilter({'polling': 3, 'other': 1})
+
+    kept = [sampling_filter.filter(build_record(**{SAMPLING_KEY: 'polling'})) for _ in range(6)]
+    assert kept == [True, False, False, True, False, False]
+    assert sampling_filter.filter(build_record(**{SAMPLING_KEY: 'other'}))
+    assert sampling_filter.filter(build_record())
+    assert sampling_filter.filter(build_record(logging.WARNING, **{SAMPLING_KEY: 'polling'}))
+
+
+def test_sampling_filter_samples_each_call_site():
+    sampling_filter = SamplingFilter({'polling': 3})
+
+    # Two lines logged for every poll are both kept once every 3 polls
+    kept = [[sampling_filter.filter(build_record(lineno=lineno, **{SAMPLING_KEY: 'polling'})) for lineno in (1, 2)]
+            for _ in range(3)]
+    assert kept == [[True, True], [False, False], [False, False]]
+
+
+def test_transport_sends_correlation_id():
+    transport = CorrelatedTransport(OIDCToken('test_auth_token'))
+    assert CORRELATION_HEADER not in transport._headers({})
+
+    def headers_in_request():
+        correlation_id = new_correlation_id('test-id')
+        return correlation_id, transport._clone()._headers({})
+
+    correlation_id, headers = in_new_context(headers_in_request)
+    assert headers[CORRELATION_HEADER] == correlation_id
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import asyncio
+import pytest
+
+from tvb_ext_unicore.prefetcher import Prefetcher, jobs_key
+from tvb_ext_unicore.single_flight import SingleFlight
+
+
+class MockFetcher(object):
+    def __init__(self):
+        self.calls = list()
+
+    def fetch_jobs(self, site, page):
+        self.calls.append(('jobs', site, page))
+        return {'jobs': [], 'message': ''}
+
+    def fetch_job_output(self, job_url):
+        self.calls.append(('job_output', job_url))
+        return {'stdout': {'is_file': True}}
+
+
+def build_payload(statuses):
+    return {'jobs': [{'resource_url': f'job{i}', 'status': status} for i, status in enumerate(statuses)],
+            'message': ''}
+
+
+def build_prefetcher(budget_per_site=10, enabled=True):
+    fetcher = MockFetcher()
+    single_flight = SingleFlight()
+    prefetcher = Prefetcher(single_flight, fetcher.fetch_jobs, fetcher.fetch_job_output, enabled, budget_per_site)
+    return prefetcher, single_flight, fetcher
+
+
+async def wait_for_calls():
+    for _ in range(10):
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_next_page_is_prefetched_and_served_from_memory():
+    prefetcher, single_flight, fetcher = build_prefetcher()
+
+    prefetcher.after_jobs_page('SITE', 0, build_payload(['RUNNING'] * 10))
+    await wait_for_calls()
+    assert fetcher.calls == [('jobs', 'SITE', 1)]
+
+    await single_flight.run(jobs_key('SITE', 1), fetcher.fetch_jobs, 'SITE', 1)
+    assert fetcher.calls == [('jobs', 'SITE', 1)]
+    assert single_flight.metrics['prefetch_hits'] == 1
+
+
+@pytest.mark.asyncio
+async def test_next_page_is_prefetched_again_only_when_page_changes(mocker):
+    # Polls of an idle panel, after the prefetched page has expired
+    mocker.patch('tvb_ext_unicore.prefetcher.JOBS_PAGE_TTL', 0)
+    prefetcher, _, fetcher = build_prefetcher()
+
+    for _ in range(3):
+        prefetcher.after_jobs_page('SITE', 0, build_payload(['RUNNING'] * 10))
+        await wait_for_calls()
+    assert fetcher.calls == [('jobs', 'SITE', 1)]
+
+    prefetcher.after_jobs_page('SITE', 0, build_payload(['SUCCESSFUL'] + ['RUNNING'] * 9))
+    await wait_for_calls()
+    prefetcher.after_jobs_page('SITE', 1, build_payload(['RUNNING'] * 10))
+    prefetcher.after_jobs_page('SITE', 0, build_payload(['SUCCESSFUL'] + ['RUNNING'] * 9))
+    await wait_for_calls()
+    page_calls = [call for call in fetcher.calls if call[0] == 'jobs']
+    assert page_calls == [('jobs', 'SITE', 1), ('jobs', 'SITE', 1), ('jobs', 'SITE', 2), ('jobs', 'SITE', 1)]
+
+
+@pytest.mark.asyncio
+async def test_last_page_is_not_prefetched():
+    prefetcher, _, fetcher = build_prefetcher()
+
+    prefetcher.after_jobs_page('SITE', 0, build_payload(['RUNNING'] * 3))
+    await wait_for_calls()
+    assert fetcher.calls == []
+
+
+@pytest.mark.asyncio
+async def test_outputs_of_just_finished_jobs_are_prefetched():
+    prefetcher, single_flight, fetcher = build_prefetcher()
+
+    prefetcher.after_jobs_page('SITE', 0, build_payload(['RUNNING', 'SUCCESSFUL', 'QUEUED']))
+    prefetcher.after_jobs_page('SITE', 0, build_payload(['FAILED', 'SUCCESSFUL', 'RUNNING']))
+    await wait_for_calls()
+
+    assert fetcher.calls == [('job_output', 'job0')]
+    assert single_flight.metrics['prefetched'] == 1
+
+
+@pytest.mark.asyncio
+async def test_prefetch_budget_per_site():
+    prefetcher, _, fetcher = build_prefetcher(budget_per_site=1)
+
+    prefetcher.after_jobs_page('SITE', 0, build_payload(['RUNNING'] * 10))
+    prefetcher.after_jobs_page('SITE', 1, build_payload(['RUNNING'] * 10))
+    prefetcher.after_jobs_page('OTHER_SITE', 0, build_payload(['RUNNING'] * 10))
+    await wait_for_calls()
+
+    assert fetcher.calls == [('jobs', 'SITE', 1), ('jobs', 'OTHER_SITE', 1)]
+    assert prefetcher.metrics == {'scheduled': 2, 'over_budget': 1}
+
+
+@pytest.mark.asyncio
+async def test_disabled_prefetcher():
+    prefetcher, _, fetcher = build_prefetcher(enabled=False)
+
+    prefetcher.after_jobs_page('SITE', 0, build_payload(['RUNNING'] * 10))
+    await wait_for_calls()
+    assert fetcher.calls == []
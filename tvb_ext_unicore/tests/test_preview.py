@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import io
+import json
+import pytest
+
+from tvb_ext_unicore.exceptions import TVBExtUnicoreException
+from tvb_ext_unicore.unicore_wrapper.preview import BlockCache, RemoteFile, preview_file, _hyperslab, \
+    MAX_PREVIEW_ITEMS, MAX_HDF5_TREE_NODES
+
+
+class MockRemotePathFile(object):
+    def __init__(self, content):
+        self.content = content
+        self.ranges = list()
+
+    def raw(self, offset=0, size=-1):
+        self.ranges.append((offset, size))
+        return io.BytesIO(self.content[offset:offset + size])
+
+
+def build_remote_file(content, block_size=16):
+    path_file = MockRemotePathFile(content)
+    return RemoteFile(path_file, 'key', len(content), BlockCache(), block_size), path_file
+
+
+def test_remote_file_reads_only_missing_blocks():
+    content = bytes(range(100))
+    remote_file, path_file = build_remote_file(content)
+
+    assert remote_file.read_range(10, 30) == content[10:40]
+    assert path_file.ranges == [(0, 48)]
+    assert remote_file.read_range(20, 40) == content[20:60]
+    assert path_file.ranges == [(0, 48), (48, 16)]
+
+    remote_file.seek(-5, io.SEEK_END)
+    assert remote_file.read() == content[-5:]
+
+
+def test_block_cache_evicts_least_recently_used():
+    cache = BlockCache(max_blocks=2)
+    cache.put('a', b'a')
+    cache.put('b', b'b')
+    cache.get('a')
+    cache.put('c', b'c')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == b'a'
+
+
+def test_preview_text_head_and_tail():
+    content = '\n'.join(f'line {i}' for i in range(50)).encode()
+    remote_file, _ = build_remote_file(content)
+
+    head = preview_file(remote_file, 'stdout', lines=2)
+    assert head['lines'] == ['line 0', 'line 1']
+    assert head['truncated']
+
+    tail = preview_file(remote_file, 'stdout', lines=2, tail=True)
+    assert tail['lines'] == ['line 48', 'line 49']
+
+
+def test_preview_npy():
+    numpy = pytest.importorskip('numpy')
+    array = numpy.arange(24, dtype='<f8').reshape(4, 6)
+    array[0, 1] = numpy.nan
+    buffer = io.BytesIO()
+    numpy.save(buffer, array)
+    remote_file, path_file = build_remote_file(buffer.getvalue(), block_size=64)
+
+    preview = preview_file(remote_file, 'time_series.npy', start=1, count=3)
+    assert preview['shape'] == [4, 6]
+    assert preview['dtype'] == '<f8'
+    assert preview['values'] == ['nan', 2.0, 3.0]
+    assert preview['truncated']
+
+
+def test_preview_npy_bounded_count():
+    numpy = pytest.importorskip('numpy')
+    buffer = io.BytesIO()
+    numpy.save(buffer, numpy.zeros(2 * MAX_PREVIEW_ITEMS))
+    remote_file, path_file = build_remote_file(buffer.getvalue(), block_size=1024)
+
+    preview = preview_file(remote_file, 'big.npy', count=10 ** 12)
+    assert len(preview['values']) == MAX_PREVIEW_ITEMS
+    assert sum(size for _, size in path_file.ranges) < len(buffer.getvalue())
+
+
+def test_preview_negative_start():
+    numpy = pytest.importorskip('numpy')
+    buffer = io.BytesIO()
+    numpy.save(buffer, numpy.arange(10, dtype='<f8'))
+    remote_file, _ = build_remote_file(buffer.getvalue())
+
+    with pytest.raises(TVBExtUnicoreException):
+        preview_file(remote_file, 'time_series.npy', start=-3)
+
+
+def test_preview_structured_npy():
+    numpy = pytest.importorskip('numpy')
+    array = numpy.array([(1, b'ab'), (2, b'cd')], dtype=[('id', '<i4'), ('label', 'S2')])
+    buffer = io.BytesIO()
+    numpy.save(buffer, array)
+    remote_file, _ = build_remote_file(buffer.getvalue())
+
+    preview = preview_file(remote_file, 'records.npy')
+    assert preview['values'] == [[1, "b'ab'"], [2, "b'cd'"]]
+    json.dumps(preview)
+
+
+@pytest.mark.parametrize('content', [b'not a numpy file', b"\x93NUMPY\x01\x00\x10\x00{'shape': (2,}      \n",
+                                     b"\x93NUMPY\x01\x00\x10\x00{'descr': '<f8'}\n",
+                                     b"\x93NUMPY\x09\x00\x10\x00\x00\x00{'descr': '<f8'}\n"])
+def test_preview_invalid_npy(content):
+    remote_file, _ = build_remote_file(content)
+    with pytest.raises(TVBExtUnicoreException):
+        preview_file(remote_file, 'broken.npy')
+
+
+def test_preview_npy_header_length_is_bounded():
+    content = b'\x93NUMPY\x02\x00' + (2 ** 20).to_bytes(4, 'little') + bytes(2 ** 20)
+    remote_file, path_file = build_remote_file(content, block_size=1024)
+
+    with pytest.raises(TVBExtUnicoreException):
+        preview_file(remote_file, 'fake.npy')
+    assert sum(size for _, size in path_file.ranges) <= 1024
+
+
+def test_preview_invalid_hdf5():
+    pytest.importorskip('h5py')
+    remote_file, _ = build_remote_file(b'not an hdf5 file' * 100)
+    with pytest.raises(TVBExtUnicoreException):
+        preview_file(remote_file, 'broken.h5')
+
+
+def test_hyperslab():
+    assert _hyperslab((1000, 1, 76, 1), 10, 100) == (slice(10, 11), slice(0, 1), slice(0, 76), slice(0, 1))
+    assert _hyperslab((5, 3), 0, 100) == (slice(0, 5), slice(0, 3))
+
+
+def test_preview_hdf5():
+    h5py = pytest.importorskip('h5py')
+    numpy = pytest.importorskip('numpy')
+    buffer = io.BytesIO()
+    with h5py.File(buffer, 'w') as h5_file:
+        h5_file.create_dataset('data', data=numpy.arange(2000).reshape(1000, 2))
+        h5_file.create_group('meta').create_dataset('dt', data=0.1)
+    remote_file, path_file = build_remote_file(buffer.getvalue(), block_size=1024)
+
+    preview = preview_file(remote_file, 'result.h5', dataset='data', start=3, count=4)
+    assert preview['tree']['data'] == {'kind': 'dataset', 'shape': [1000, 2], 'dtype': 'int64'}
+    assert preview['tree']['meta'] == {'kind': 'group'}
+    assert preview['selection'] == [[3, 5], [0, 2]]
+    assert preview['values'] == [[6, 7], [8, 9]]
+
+
+def test_preview_hdf5_stops_walking_large_trees(mocker):
+    h5py = pytest.importorskip('h5py')
+    buffer = io.BytesIO()
+    with h5py.File(buffer, 'w') as h5_file:
+        for i in range(MAX_HDF5_TREE_NODES + 50):
+            h5_file.create_group(f'group_{i}')
+    remote_file, _ = build_remote_file(buffer.getvalue(), block_size=1024)
+
+    # Every visited node is opened by name
+    opened_nodes = mocker.spy(h5py.Group, '__getitem__')
+    preview = preview_file(remote_file, 'result.h5')
+    assert preview['truncated']
+    assert len(preview['tree']) == MAX_HDF5_TREE_NODES
+    assert opened_nodes.call_count == MAX_HDF5_TREE_NODES + 1
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import asyncio
+import threading
+import pytest
+
+from tvb_ext_unicore.single_flight import SingleFlight
+
+
+class BlockingCall(object):
+    def __init__(self, result='result', error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self, *args):
+        self.calls += 1
+        self.release.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_coalesced():
+    single_flight = SingleFlight(result_ttl=0)
+    call = BlockingCall()
+
+    tasks = [asyncio.ensure_future(single_flight.run(('jobs', 'SITE', 0), call, 'SITE', 0)) for _ in range(3)]
+    other = asyncio.ensure_future(single_flight.run(('jobs', 'SITE', 1), call, 'SITE', 1))
+    await asyncio.sleep(0.01)
+    call.release.set()
+
+    assert await asyncio.gather(*tasks, other) == ['result'] * 4
+    assert call.calls == 2
+    metrics = single_flight.metrics
+    assert metrics['upstream_calls'] == 2
+    assert metrics['coalesced'] == 2
+    assert metrics['saved_calls'] == 2
+    assert metrics['in_flight'] == 0
+
+
+@pytest.mark.asyncio
+async def test_result_is_shared_within_window():
+    single_flight = SingleFlight(result_ttl=60)
+    call = BlockingCall()
+    call.release.set()
+
+    await single_flight.run(('job_output', 'url'), call, 'url')
+    await single_flight.run(('job_output', 'url'), call, 'url')
+    assert call.calls == 1
+    assert single_flight.metrics['served_from_window'] == 1
+
+    single_flight.forget('job_output')
+    await single_flight.run(('job_output', 'url'), call, 'url')
+    assert call.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_forget_discards_calls_in_flight():
+    single_flight = SingleFlight(result_ttl=60)
+    before_cancel = BlockingCall(result='before cancel')
+    after_cancel = BlockingCall(result='after cancel')
+    after_cancel.release.set()
+
+    assert single_flight.prefetch(('jobs', 'SITE', 1), 60, before_cancel)
+    single_flight.forget('jobs')
+    assert await single_flight.run(('jobs', 'SITE', 1), after_cancel) == 'after cancel'
+
+    before_cancel.release.set()
+    await asyncio.sleep(0.05)
+    assert await single_flight.run(('jobs', 'SITE', 1), after_cancel) == 'after cancel'
+    assert after_cancel.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared_but_not_kept():
+    single_flight = SingleFlight(result_ttl=60)
+    call = BlockingCall(error=ValueError('upstream error'))
+
+    tasks = [asyncio.ensure_future(single_flight.run(('jobs', 'SITE', 0), call)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    call.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    with pytest.raises(ValueError):
+        await single_flight.run(('jobs', 'SITE', 0), call)
+    assert call.calls == 2
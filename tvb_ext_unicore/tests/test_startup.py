@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import os
+import subprocess
+import sys
+
+import tvb_ext_unicore
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(tvb_ext_unicore.__file__))
+LOG_FILE = '.tvb_ext_unicore.log'
+
+
+def run_python(code, home):
+    env = dict(os.environ, HOME=str(home))
+    env['PYTHONPATH'] = os.pathsep.join([PACKAGE_ROOT, env.get('PYTHONPATH', '')])
+    return subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env, capture_output=True,
+                          text=True, check=True)
+
+
+def imported_modules(importtime_output):
+    # type: (str) -> dict
+    """
+    Cumulative import time (in microseconds) of each module, by name.
+    """
+    # -X importtime lines look like: "import time:   self [us] |  cumulative | imported package"
+    modules = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def test_package_import_is_lightweight(tmp_path, record_property):
+    result = run_python('import tvb_ext_unicore', tmp_path)
+    modules = imported_modules(result.stderr)
+
+    assert 'tvb_ext_unicore' in modules
+    record_property('import_time_us', modules['tvb_ext_unicore'])
+    print(f'tvb_ext_unicore imported in {modules["tvb_ext_unicore"] / 1000:.1f} ms')
+    for heavy_module in ['pyunicore', 'requests', 'tvb_ext_unicore.handlers',
+                         'tvb_ext_unicore.unicore_wrapper.unicore_wrapper']:
+        assert heavy_module not in modules
+    assert not os.path.exists(os.path.join(tmp_path, LOG_FILE))
+
+
+def test_logging_is_configured_on_first_record(tmp_path):
+    code = ("from tvb_ext_unicore.logger.builder import get_logger, GLOBAL_LOGGER_BUILDER\n"
+            "logger = get_logger('tvb_ext_unicore.test')\n"
+            "assert not GLOBAL_LOGGER_BUILDER._configured\n"
+            "logger.info('first record')\n"
+            "GLOBAL_LOGGER_BUILDER.configure()\n"
+            "logger.info('second record')\n")
+    result = run_python(code, tmp_path)
+
+    assert result.stdout.count('first record') == 1
+    assert result.stdout.count('second record') == 1
+    with open(os.path.join(tmp_path, LOG_FILE)) as f:
+        assert f.read().count('first record') == 1
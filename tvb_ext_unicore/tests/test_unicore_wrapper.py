@@ -8,10 +8,12 @@
 import json
 import os
 import pytest
+import requests
 from datetime import datetime
 
 from tvb_ext_unicore.exceptions import TVBExtUnicoreException, SitesDownException, \
     FileNotExistsException, JobRunningException
+from tvb_ext_unicore.unicore_wrapper.download_cache import DownloadCache
 from tvb_ext_unicore.unicore_wrapper.unicore_wrapper import UnicoreWrapper, DOWNLOAD_MESSAGE
 from tvb_ext_unicore.unicore_wrapper.job_dto import JobDTO, NAME, OWNER, SITE_NAME, STATUS, SUBMISSION_TIME, \
     TERMINATION_TIME, \
@@ -268,3 +270,178 @@ def test_build_response(mocker):
     mocker.patch(SHUTIL_MOVE, lambda x, y: True)
     status, message = DownloadStatus.SUCCESS, 'Downloaded'
     assert build_response(status, message) == json.dumps({'status': status, 'message': message})
+
+
+class MockCachedFilePath(MockFilePath):
+    def __init__(self):
+        super().__init__()
+        self.properties = {'size': 4, 'lastAccessed': '2022-02-10T10:30:45+0100'}
+        self.downloads = 0
+
+    def download(self, file):
+        self.downloads += 1
+        with open(file, 'wb') as f:
+            f.write(b'test')
+
+
+def test_download_file_served_from_cache(mocker, tmp_path):
+    os.environ['CLB_AUTH'] = "test_auth_token"
+    path_file = MockCachedFilePath()
+
+    def mockk(self, job_url):
+        job = MockPyUnicoreJob(job_url=job_url)
+        job.working_dir = WorkingDirMock({'file1': path_file})
+        return job
+
+    mocker.patch(GET_JOB, mockk)
+    mocker.patch('pyunicore.client.PathFile', MockCachedFilePath)
+    unicore_wrapper = UnicoreWrapper()
+    unicore_wrapper.download_cache = DownloadCache(cache_dir=str(tmp_path / 'cache'), max_size=1024)
+
+    for out_file in ['first', 'second']:
+        out_path = str(tmp_path / out_file)
+        assert unicore_wrapper.download_file('test_url', 'file1', out_path) == DOWNLOAD_MESSAGE
+        with open(out_path, 'rb') as f:
+            assert f.read() == b'test'
+
+    assert path_file.downloads == 1
+
+    # Writing the downloaded result in place must not alter the later downloads
+    with open(out_path, 'r+b') as f:
+        f.write(b'TEST')
+    os.utime(out_path, ns=(0, os.stat(out_path).st_mtime_ns + 1))
+    third_path = str(tmp_path / 'third')
+    unicore_wrapper.download_file('test_url', 'file1', third_path)
+    with open(third_path, 'rb') as f:
+        assert f.read() == b'test'
+    assert path_file.downloads == 2
+
+
+def test_preview_file_fails_when_job_is_running(mocker):
+    def mockk(self, job_url):
+        return MockPyUnicoreJob(job_url=job_url, isrunning=True)
+
+    mocker.patch(GET_JOB, mockk)
+    with pytest.raises(JobRunningException):
+        UnicoreWrapper().preview_file('test_url', 'file1')
+
+
+def test_preview_file_fails_when_file_doesnt_exist(mocker):
+    def mockk(self, job_url):
+        return MockPyUnicoreJob(job_url=job_url)
+
+    mocker.patch(GET_JOB, mockk)
+    with pytest.raises(FileNotExistsException):
+        UnicoreWrapper().preview_file('test_url', 'test_file')
+
+
+class MockPyUnicoreTransfer:
+    def __init__(self, file_name, remote_url):
+        self.resource_url = f'transfers/{file_name}'
+        self.properties = {'source': file_name, 'target': remote_url, 'status': 'RUNNING',
+                           'transferredBytes': 50, 'size': 200}
+
+
+class TransferWorkingDirMock(WorkingDirMock):
+    def __init__(self):
+        super().__init__()
+        self.sent = list()
+
+    def send_file(self, file_name, remote_url, protocol=None):
+        if file_name == 'file2':
+            raise requests.HTTPError('503 Server Error: Service Unavailable')
+        self.sent.append((file_name, remote_url, protocol))
+        return MockPyUnicoreTransfer(file_name, remote_url)
+
+
+def test_start_transfers_fails_when_job_is_running(mocker):
+    def mockk(self, job_url):
+        return MockPyUnicoreJob(job_url=job_url, isrunning=True)
+
+    mocker.patch(GET_JOB, mockk)
+    with pytest.raises(JobRunningException):
+        UnicoreWrapper().start_transfers('test_url', ['file1'], 'https://site/storages/PROJECT/files/results')
+
+
+def test_start_transfers_fails_when_one_file_doesnt_exist(mocker):
+    working_dir = TransferWorkingDirMock()
+
+    def mockk(self, job_url):
+        job = MockPyUnicoreJob(job_url=job_url)
+        job.working_dir = working_dir
+        return job
+
+    mocker.patch(GET_JOB, mockk)
+    with pytest.raises(FileNotExistsException):
+        UnicoreWrapper().start_transfers('test_url', ['file1', 'test_file'], 'https://site/storages/PROJECT/files')
+    assert working_dir.sent == []
+
+
+def test_start_transfers(mocker):
+    working_dir = TransferWorkingDirMock()
+
+    def mockk(self, job_url):
+        job = MockPyUnicoreJob(job_url=job_url)
+        job.working_dir = working_dir
+        return job
+
+    mocker.patch(GET_JOB, mockk)
+    transfers, errors = UnicoreWrapper().start_transfers('test_url', ['file1', 'dir1'],
+                                                         'https://site/storages/PROJECT/files/results/', 'UFTP')
+
+    assert working_dir.sent == [('file1', 'https://site/storages/PROJECT/files/results/file1', 'UFTP'),
+                                ('dir1', 'https://site/storages/PROJECT/files/results/dir1', 'UFTP')]
+    assert [transfer.to_json()['progress'] for transfer in transfers] == [25.0, 25.0]
+    assert all(transfer.is_running for transfer in transfers)
+    assert errors == {}
+
+
+def test_start_transfers_partial_failure(mocker):
+    os.environ['CLB_AUTH'] = "test_auth_token"
+    working_dir = TransferWorkingDirMock()
+    working_dir.dirs['file2'] = MockFilePath()
+
+    def mockk(self, job_url):
+        job = MockPyUnicoreJob(job_url=job_url)
+        job.working_dir = working_dir
+        return job
+
+    mocker.patch(GET_JOB, mockk)
+    transfers, errors = UnicoreWrapper().start_transfers('test_url', ['file1', 'file2', 'dir1'],
+                                                         'https://site/storages/PROJECT/files')
+
+    assert [transfer.resource_url for transfer in transfers] == ['transfers/file1', 'transfers/dir1']
+    assert list(errors) == ['file2']
+
+
+class MockAbortableTransfer(object):
+    aborted = list()
+
+    def __init__(self, transport, transfer_url):
+        self.resource_url = transfer_url
+
+    @property
+    def properties(self):
+        status = self.resource_url.rsplit('/', 1)[-1]
+        if status == 'UNKNOWN':
+            raise requests.HTTPError('404 Client Error: Not Found')
+        return {'status': status}
+
+    def abort(self):
+        self.aborted.append(self.resource_url)
+
+
+def test_abort_transfer_only_running(mocker):
+    os.environ['CLB_AUTH'] = "test_auth_token"
+    mocker.patch('pyunicore.client.Transfer', MockAbortableTransfer)
+    MockAbortableTransfer.aborted = list()
+    unicore_wrapper = UnicoreWrapper()
+
+    assert unicore_wrapper.abort_transfer('transfers/ABORTED').status == 'ABORTED'
+    unicore_wrapper.abort_transfer('transfers/RUNNING')
+    assert MockAbortableTransfer.aborted == ['transfers/RUNNING']
+
+    with pytest.raises(TVBExtUnicoreException):
+        unicore_wrapper.abort_transfer('transfers/UNKNOWN')
+    with pytest.raises(TVBExtUnicoreException):
+        unicore_wrapper.get_transfer('transfers/UNKNOWN')
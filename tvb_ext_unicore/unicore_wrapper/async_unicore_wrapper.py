@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import asyncio
+
+from tvb_ext_unicore.executor import DEFAULT_MAX_WORKERS, build_executor, run_in_context
+from tvb_ext_unicore.logger.builder import get_logger
+from tvb_ext_unicore.unicore_wrapper.job_dto import JobDTO, FINISHED_STATUSES
+from tvb_ext_unicore.unicore_wrapper.unicore_wrapper import UnicoreWrapper
+
+LOGGER = get_logger(__name__)
+
+
+class AsyncUnicoreWrapper(object):
+    """
+    asyncio counterpart of UnicoreWrapper, meant to be used from notebooks, e.g.:
+
+        unicore = AsyncUnicoreWrapper()
+        async for job in unicore.wait_for_jobs(job_urls):
+            print(job)
+
+    pyunicore is blocking, so the calls are run on a bounded thread pool. All of them go through the transport of a
+    single UnicoreWrapper, hence share one HTTP connection pool.
+    """
+
+    def __init__(self, unicore_wrapper=None, max_workers=DEFAULT_MAX_WORKERS):
+        # type: (UnicoreWrapper, int) -> None
+        self.unicore_wrapper = unicore_wrapper or UnicoreWrapper()
+        self._executor = build_executor(max_workers)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, func, *args):
+        return await run_in_context(self._executor, func, *args)
+
+    async def get_jobs(self, sites, page=0):
+        # type: (list, int) -> dict
+        """
+        Retrieve concurrently the jobs of the current user from several sites. A site that cannot be reached gets
+        an empty list of jobs and an error message, the other sites are still answered.
+        returns: {<site>: (<list of JobDTO>, <message>)}
+        """
+
+        async def get_site_jobs(site):
+            try:
+                return await self._run(self.unicore_wrapper.get_jobs, site, page)
+            except Exception as e:
+                LOGGER.warning(f"Cannot retrieve jobs from {site}: {e}")
+                return list(), f'Jobs of {site} are not available at the moment!'
+
+        results = await asyncio.gather(*[get_site_jobs(site) for site in sites])
+        return dict(zip(sites, results))
+
+    async def download_files(self, files, return_exceptions=False):
+        """
+        Download concurrently several job outputs and yield (job_url, file_name, result) in completion order.
+        :param files: iterable of (job_url, file_name, path) tuples, path may be None as for download_file
+        :param return_exceptions: if True, a failed download yields its exception as result instead of raising it
+        """
+
+        async def download(job_url, file_name, path):
+            try:
+                result = await self._run(self.unicore_wrapper.download_file, job_url, file_name, path)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                result = e
+            return job_url, file_name, result
+
+        for next_done in asyncio.as_completed([download(*file_details) for file_details in files]):
+            yield await next_done
+
+    async def wait_for_jobs(self, job_urls, min_interval=2, max_interval=60, backoff=1.5, timeout=None):
+        """
+        Poll the given jobs together until they finish, and yield a JobDTO for each one in completion order.
+        The polling interval grows from min_interval up to max_interval while no job changes its status,
+        and falls back to min_interval as soon as one does. A job whose poll fails (e.g. the site is overloaded)
+        stays pending and is polled again later.
+        :param timeout: seconds after which a TimeoutError is raised if some jobs are still running
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        last_statuses = dict.fromkeys(job_urls)
+        interval = min_interval
+
+        while last_statuses:
+            pending = list(last_statuses)
+            statuses = await asyncio.gather(*[self._run(self.unicore_wrapper.get_job_status, url) for url in pending],
+                                            return_exceptions=True)
+
+            status_changed = False
+            for job_url, status in zip(pending, statuses):
+                if isinstance(status, Exception):
+                    LOGGER.warning(f"Cannot poll the status of job at {job_url}, will retry: {status}")
+                    continue
+                if status != last_statuses[job_url]:
+                    status_changed = True
+                    last_statuses[job_url] = status
+                if status in FINISHED_STATUSES:
+                    try:
+                        job = await self._run(self.unicore_wrapper.get_job, job_url)
+                        job_dto = await self._run(JobDTO.from_unicore_job, job)
+                    except Exception as e:
+                        LOGGER.warning(f"Cannot retrieve finished job at {job_url}, will retry: {e}")
+                        continue
+                    del last_statuses[job_url]
+                    LOGGER.info(f"Job at {job_url} finished with status {status}")
+                    yield job_dto
+
+            if not last_statuses:
+                break
+
+            interval = min_interval if status_changed else min(interval * backoff, max_interval)
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise TimeoutError(f"Timeout waiting for jobs: {', '.join(last_statuses)}")
+                interval = min(interval, remaining)
+            await asyncio.sleep(interval)
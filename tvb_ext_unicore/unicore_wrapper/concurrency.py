@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+from tvb_ext_unicore.logger.builder import get_logger
+from tvb_ext_unicore.utils import get_user_settings
+
+LOGGER = get_logger(__name__)
+
+DEFAULT_FLOOR = 1
+DEFAULT_CEILING = 16
+DEFAULT_INITIAL_LIMIT = 4
+# Multiplicative decrease on overload signals (429, 5xx, no response) and on rising latency
+BACKOFF_FACTOR = 0.5
+LATENCY_BACKOFF_FACTOR = 0.9
+# Latency is considered rising when the recent average exceeds the baseline by this factor
+LATENCY_TOLERANCE = 1.5
+SHORT_LATENCY_WEIGHT = 0.3
+BASELINE_LATENCY_WEIGHT = 0.05
+MAX_RETRY_AFTER = 60
+
+
+def _moving_average(average, value, weight):
+    return value if average is None else (1 - weight) * average + weight * value
+
+
+class AdaptiveLimiter(object):
+    """
+    Adaptive (AIMD) limit of the concurrent calls made to one UNICORE site. The limit grows by about one call per
+    round of calls while the latency stays close to its baseline, and shrinks when the site signals overload
+    (429, 5xx, no response) or when the latency rises. A Retry-After sent by the site pauses all new calls.
+    """
+
+    def __init__(self, floor=DEFAULT_FLOOR, ceiling=DEFAULT_CEILING, initial_limit=DEFAULT_INITIAL_LIMIT):
+        # type: (int, int, int) -> None
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self.limit = float(min(self.ceiling, max(self.floor, initial_limit)))
+        self.in_flight = 0
+        self._recent_latency = None
+        self._baseline_latency = None
+        self._resume_at = 0
+        self._calls_since_backoff = self.ceiling
+        self._condition = threading.Condition()
+        self._metrics = {'calls': 0, 'backoffs': 0, 'paused': 0}
+
+    @property
+    def metrics(self):
+        # type: () -> dict
+        with self._condition:
+            metrics = dict(self._metrics)
+            metrics.update({'limit': round(self.limit, 2), 'in_flight': self.in_flight,
+                            'recent_latency': self._recent_latency, 'baseline_latency': self._baseline_latency})
+            return metrics
+
+    def acquire(self):
+        """
+        Wait until a call can be made to the site.
+        """
+        with self._condition:
+            while True:
+                pause = self._resume_at - time.monotonic()
+                if pause <= 0 and self.in_flight < int(self.limit):
+                    break
+                self._condition.wait(timeout=pause if pause > 0 else None)
+            self.in_flight += 1
+            self._metrics['calls'] += 1
+
+    def release(self, latency, status_code=None, retry_after=None):
+        # type: (float, int, float) -> None
+        """
+        Record the outcome of a call and adapt the limit.
+        :param status_code: HTTP status of the response, None if no response has been received
+        :param retry_after: seconds to wait before the next call, as asked by the site
+        """
+        with self._condition:
+            at_limit = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            self._calls_since_backoff += 1
+            if status_code is None or status_code == 429 or status_code >= 500:
+                self._back_off(BACKOFF_FACTOR, f"status {status_code}")
+                if retry_after:
+                    self._metrics['paused'] += 1
+                    self._resume_at = max(self._resume_at, time.monotonic() + min(retry_after, MAX_RETRY_AFTER))
+            else:
+                self._recent_latency = _moving_average(self._recent_latency, latency, SHORT_LATENCY_WEIGHT)
+                self._baseline_latency = _moving_average(self._baseline_latency, latency, BASELINE_LATENCY_WEIGHT)
+                if self._recent_latency > self._baseline_latency * LATENCY_TOLERANCE:
+                    self._back_off(LATENCY_BACKOFF_FACTOR, "rising latency")
+                elif at_limit:
+                    # Only grow when the limit is actually what holds the calls back
+                    self.limit = min(self.ceiling, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def discard(self):
+        # type: () -> None
+        """
+        Free the slot of a call which tells nothing about the load of the site (e.g. interrupted by the user).
+        """
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _back_off(self, factor, reason):
+        # The calls of one round see the same overload, only back off once per round
+        if self._calls_since_backoff < int(self.limit):
+            return
+        self._calls_since_backoff = 0
+        limit = max(self.floor, self.limit * factor)
+        if int(limit) < int(self.limit):
+            LOGGER.info(f"Reducing concurrency from {int(self.limit)} to {int(limit)} due to {reason}")
+        self.limit = limit
+        self._metrics['backoffs'] += 1
+
+
+class SiteGovernor(object):
+    """
+    Process wide registry of the AdaptiveLimiter of each site. Several UNICORE sites are often served behind one
+    gateway (https://<host>/<SITE>/rest/core), so a site is identified by the host and the path before /rest/.
+    The floor and ceiling come from the 'concurrencyFloor' and 'concurrencyCeiling' user settings.
+    """
+
+    def __init__(self, floor=None, ceiling=None):
+        # type: (int, int) -> None
+        self.floor = floor
+        self.ceiling = ceiling
+        self._limiters = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def site_of(url):
+        # type: (str) -> str
+        parts = urlsplit(url or '')
+        site_path = parts.path.partition('/rest/')[0] if '/rest/' in parts.path else ''
+        return parts.netloc + site_path.rstrip('/')
+
+    def limiter_for(self, url):
+        # type: (str) -> AdaptiveLimiter
+        site = self.site_of(url)
+        with self._lock:
+            if site not in self._limiters:
+                if self.floor is None or self.ceiling is None:
+                    settings = get_user_settings()
+                    self.floor = self.floor or int(settings.get('concurrencyFloor', DEFAULT_FLOOR))
+                    self.ceiling = self.ceiling or int(settings.get('concurrencyCeiling', DEFAULT_CEILING))
+                self._limiters[site] = AdaptiveLimiter(self.floor, self.ceiling)
+            return self._limiters[site]
+
+    @property
+    def metrics(self):
+        # type: () -> dict
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {site: limiter.metrics for site, limiter in limiters.items()}
+
+
+SITE_GOVERNOR = SiteGovernor()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from tvb_ext_unicore.logger.builder import get_logger
+from tvb_ext_unicore.utils import get_user_settings
+
+LOGGER = get_logger(__name__)
+
+CACHE_FOLDER = '.tvb_ext_unicore_cache'
+DEFAULT_CACHE_SIZE_MB = 10240
+SIZE = 'size'
+# UNICORE file listings report the last modification time of a file under this (misleading) property name
+LAST_MODIFIED = 'lastAccessed'
+STAMP_SUFFIX = '.stamp'
+TMP_PREFIX = '.tmp-'
+# Staged files older than this are left over by an interrupted put, not being written by another process
+TMP_MAX_AGE = 3600
+
+
+class DownloadCache(object):
+    """
+    Local on-disk cache for files produced by finished jobs.
+    Outputs of a finished job never change, so an entry is keyed by the job URL, the file path inside the
+    working directory and the remote size/modification time. Entries are served as hardlinks (or copies when
+    linking is not possible) and evicted in least-recently-used order when the cache exceeds its size limit.
+    As an entry shares its inode with the files served from it, a stamp file next to it records the size and
+    modification time of the entry when it was stored: an entry written in place since then is dropped. The
+    stamp also carries the last use of the entry, so that the served files keep their own modification time.
+    The cache lives in the user's home folder, so it is shared by the server extension and the kernels.
+    """
+
+    def __init__(self, cache_dir=None, max_size=None):
+        # type: (str, int) -> None
+        """
+        :param cache_dir: folder holding the cached files, defaults to ~/.tvb_ext_unicore_cache
+        :param max_size: cache size limit in bytes, defaults to the 'downloadCacheSize' user setting (in MB)
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser('~'), CACHE_FOLDER)
+        if max_size is None:
+            max_size = int(get_user_settings().get('downloadCacheSize', DEFAULT_CACHE_SIZE_MB)) * 1024 * 1024
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    @staticmethod
+    def build_key(job_url, file_name, size, last_modified):
+        # type: (str, str, int, str) -> str
+        """
+        Build the cache key of a job output file from its location and remote signature.
+        """
+        signature = '\n'.join([job_url, file_name, str(size), str(last_modified)])
+        return hashlib.sha256(signature.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    @staticmethod
+    def _signature(stat):
+        return f'{stat.st_size} {stat.st_mtime_ns}'
+
+    @staticmethod
+    def _remove(entry):
+        for path in (entry, entry + STAMP_SUFFIX):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def get(self, key, path, size=None):
+        # type: (str, str, int) -> bool
+        """
+        Materialize the cached entry at the given path. Returns False on a cache miss.
+        """
+        if not self.enabled:
+            return False
+
+        entry = self._entry_path(key)
+        stamp = entry + STAMP_SUFFIX
+        try:
+            with open(stamp) as f:
+                signature = f.read()
+            stat = os.stat(entry)
+        except FileNotFoundError:
+            return False
+
+        if (size is not None and str(stat.st_size) != str(size)) or self._signature(stat) != signature:
+            # The remote file changed, or the entry has been written in place through a file served from it
+            LOGGER.warning(f"Dropping corrupted cache entry {key}")
+            self._remove(entry)
+            return False
+
+        try:
+            # mtime of the stamp marks the last use of the entry, which drives the LRU eviction
+            os.utime(stamp)
+            self._materialize(entry, path)
+        except FileNotFoundError:
+            # Evicted meanwhile by another process sharing the cache
+            return False
+        LOGGER.info(f"Served {path} from the download cache")
+        return True
+
+    def put(self, key, path):
+        # type: (str, str) -> None
+        """
+        Store the freshly downloaded file found at the given path under the given key.
+        """
+        if not self.enabled or not os.path.isfile(path):
+            return
+
+        if os.path.getsize(path) > self.max_size:
+            LOGGER.info(f"{path} is larger than the download cache, it will not be cached")
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = self._entry_path(key)
+        fd, tmp_stamp = tempfile.mkstemp(dir=self.cache_dir, prefix=TMP_PREFIX)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                self._materialize(path, entry)
+                f.write(self._signature(os.stat(entry)))
+            os.replace(tmp_stamp, entry + STAMP_SUFFIX)
+        except OSError as e:
+            LOGGER.warning(f"Could not add {path} to the download cache: {e}")
+            if os.path.exists(tmp_stamp):
+                os.remove(tmp_stamp)
+            return
+
+        self.evict()
+
+    def evict(self):
+        # type: () -> None
+        """
+        Remove the least recently used entries until the cache fits its size limit.
+        """
+        entries = list()
+        total_size = 0
+        now = time.time()
+        for entry in os.scandir(self.cache_dir):
+            try:
+                if entry.name.startswith(TMP_PREFIX):
+                    if entry.stat().st_mtime < now - TMP_MAX_AGE:
+                        os.remove(entry.path)
+                    continue
+                if entry.name.endswith(STAMP_SUFFIX):
+                    if not os.path.exists(entry.path[:-len(STAMP_SUFFIX)]):
+                        os.remove(entry.path)
+                    continue
+            except FileNotFoundError:
+                continue
+            try:
+                size = entry.stat().st_size
+            except FileNotFoundError:
+                continue
+            try:
+                last_use = os.stat(entry.path + STAMP_SUFFIX).st_mtime
+            except FileNotFoundError:
+                # Entries without a stamp cannot be served anymore
+                last_use = 0
+            entries.append((last_use, size, entry.path))
+            total_size += size
+
+        for last_use, size, entry_path in sorted(entries):
+            if total_size <= self.max_size and last_use > 0:
+                break
+            self._remove(entry_path)
+            total_size -= size
+
+    def clear(self):
+        # type: () -> None
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    @staticmethod
+    def _materialize(src, dst):
+        # Stage next to dst and rename: readers never see partial files, and dst stays as it was if src vanishes
+        fd, staged = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(dst)), prefix=TMP_PREFIX)
+        os.close(fd)
+        os.remove(staged)
+        try:
+            try:
+                os.link(src, staged)
+            except FileNotFoundError:
+                raise
+            except OSError:
+                # e.g. cache and destination are on different file systems
+                shutil.copyfile(src, staged)
+            os.replace(staged, dst)
+        except BaseException:
+            if os.path.lexists(staged):
+                os.remove(staged)
+            raise
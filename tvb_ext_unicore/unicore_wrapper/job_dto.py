@@ -15,6 +15,8 @@ STATUS = 'status'
 SITE_NAME = 'siteName'
 OWNER = 'owner'
 LOGS = 'log'
+JOBS_PER_PAGE = 10
+FINISHED_STATUSES = ('SUCCESSFUL', 'FAILED')
 
 
 class JobDTO(object):
@@ -58,8 +60,7 @@ class JobDTO(object):
 
     @property
     def is_cancelable(self):
-        finished_status = ['SUCCESSFUL', 'FAILED']
-        return self.status not in finished_status
+        return self.status not in FINISHED_STATUSES
 
     @staticmethod
     def from_unicore_job(job):
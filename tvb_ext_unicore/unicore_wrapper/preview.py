@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+import ast
+import io
+import math
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+from tvb_ext_unicore.exceptions import TVBExtUnicoreException
+from tvb_ext_unicore.logger.builder import get_logger
+
+LOGGER = get_logger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+MAX_CACHED_BLOCKS = 256
+DEFAULT_PREVIEW_LINES = 20
+DEFAULT_PREVIEW_ITEMS = 100
+# Upper bound of the requested elements (or lines), so that a preview stays in the order of kilobytes
+MAX_PREVIEW_ITEMS = 10000
+MAX_TEXT_PREVIEW_BYTES = 4 * BLOCK_SIZE
+MAX_HDF5_TREE_NODES = 200
+NPY_MAGIC = b'\x93NUMPY'
+# Same default as numpy's max_header_size
+MAX_NPY_HEADER_SIZE = 10000
+NPY_EXTENSIONS = ('.npy',)
+HDF5_EXTENSIONS = ('.h5', '.hdf5')
+
+
+class BlockCache(object):
+    """
+    Thread-safe LRU cache of fixed size file blocks, shared by all the previews served by this process.
+    """
+
+    def __init__(self, max_blocks=MAX_CACHED_BLOCKS):
+        self.max_blocks = max_blocks
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+            return block
+
+    def put(self, key, block):
+        with self._lock:
+            self._blocks[key] = block
+            self._blocks.move_to_end(key)
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+
+
+PREVIEW_BLOCK_CACHE = BlockCache()
+
+
+class RemoteFile(io.RawIOBase):
+    """
+    Read-only, seekable file object over a remote job output, fetching the needed blocks with ranged reads.
+    """
+
+    def __init__(self, path_file, cache_key, size, block_cache=PREVIEW_BLOCK_CACHE, block_size=BLOCK_SIZE):
+        # type: (unicore_client.PathFile, str, int, BlockCache, int) -> None
+        super().__init__()
+        self.path_file = path_file
+        self.cache_key = cache_key
+        self.size = size
+        self.block_cache = block_cache
+        self.block_size = block_size
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self.position = offset
+        return self.position
+
+    def readinto(self, buffer):
+        data = self.read_range(self.position, len(buffer))
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def read_range(self, offset, size):
+        # type: (int, int) -> bytes
+        """
+        Read size bytes starting at offset, fetching every run of missing blocks with a single ranged read.
+        """
+        end = min(offset + size, self.size)
+        if offset >= end:
+            return b''
+
+        first_block, last_block = offset // self.block_size, (end - 1) // self.block_size
+        blocks = {index: self.block_cache.get((self.cache_key, index)) for index in range(first_block, last_block + 1)}
+        missing = [index for index, block in blocks.items() if block is None]
+        while missing:
+            run_end = 0
+            while run_end + 1 < len(missing) and missing[run_end + 1] == missing[run_end] + 1:
+                run_end += 1
+            blocks.update(self._fetch_blocks(missing[0], missing[run_end]))
+            missing = missing[run_end + 1:]
+
+        data = b''.join(blocks[index] for index in range(first_block, last_block + 1))
+        start = offset - first_block * self.block_size
+        return data[start:start + end - offset]
+
+    def _fetch_blocks(self, first_block, last_block):
+        start = first_block * self.block_size
+        size = min((last_block + 1) * self.block_size, self.size) - start
+        data = self.path_file.raw(offset=start, size=size).read()
+        fetched = dict()
+        for index in range(first_block, last_block + 1):
+            block_start = (index - first_block) * self.block_size
+            fetched[index] = block = data[block_start:block_start + self.block_size]
+            self.block_cache.put((self.cache_key, index), block)
+        return fetched
+
+
+def preview_text(remote_file, lines=DEFAULT_PREVIEW_LINES, tail=False):
+    # type: (RemoteFile, int, bool) -> dict
+    """
+    Return the first (or last) lines of a text file, reading at most MAX_TEXT_PREVIEW_BYTES.
+    """
+    read_size = min(remote_file.size, MAX_TEXT_PREVIEW_BYTES)
+    offset = remote_file.size - read_size if tail else 0
+    text = remote_file.read_range(offset, read_size).decode('utf-8', errors='replace')
+    all_lines = text.splitlines()
+    if tail:
+        # The first line might have been cut by the ranged read
+        if offset > 0:
+            all_lines = all_lines[1:]
+        selected = all_lines[-lines:]
+    else:
+        selected = all_lines[:lines]
+    return {'type': 'text', 'size': remote_file.size, 'tail': tail, 'lines': selected,
+            'truncated': read_size < remote_file.size or len(selected) < len(all_lines)}
+
+
+def _read_npy_header(remote_file):
+    prefix = remote_file.read_range(0, 12)
+    if not prefix.startswith(NPY_MAGIC) or len(prefix) < 12:
+        raise TVBExtUnicoreException('Not a valid .npy file!')
+    major_version = prefix[6]
+    if major_version == 1:
+        header_length, = struct.unpack('<H', prefix[8:10])
+        header_start = 10
+    elif major_version in (2, 3):
+        header_length, = struct.unpack('<I', prefix[8:12])
+        header_start = 12
+    else:
+        raise TVBExtUnicoreException(f'Unsupported .npy format version {major_version}!')
+    # The header length comes from the file itself, never trust it for more than numpy does
+    if header_length > MAX_NPY_HEADER_SIZE:
+        raise TVBExtUnicoreException(f'.npy header of {header_length} bytes exceeds {MAX_NPY_HEADER_SIZE} bytes!')
+    try:
+        header = ast.literal_eval(remote_file.read_range(header_start, header_length).decode('latin1'))
+        shape = [int(dim) for dim in header['shape']]
+        descr, fortran_order = header['descr'], bool(header['fortran_order'])
+    except (ValueError, SyntaxError, TypeError, KeyError, MemoryError, RecursionError) as e:
+        raise TVBExtUnicoreException(f'Not a valid .npy file header: {e}')
+    return shape, descr, fortran_order, header_start + header_length
+
+
+def _to_json_values(values):
+    # Records of structured arrays come as tuples
+    if isinstance(values, (list, tuple)):
+        return [_to_json_values(value) for value in values]
+    if isinstance(values, float) and not math.isfinite(values):
+        return str(values)
+    if isinstance(values, (complex, bytes)):
+        return str(values)
+    return values
+
+
+def preview_npy(remote_file, start=0, count=DEFAULT_PREVIEW_ITEMS):
+    # type: (RemoteFile, int, int) -> dict
+    """
+    Return the header of a .npy file and, when numpy is available, count elements (in storage order) from start.
+    """
+    shape, descr, fortran_order, data_offset = _read_npy_header(remote_file)
+    preview = {'type': 'npy', 'size': remote_file.size, 'shape': shape, 'dtype': str(descr),
+               'fortran_order': fortran_order, 'start': start, 'values': None}
+    try:
+        import numpy
+    except ImportError:
+        LOGGER.warning("numpy is not installed, .npy previews only contain the header")
+        return preview
+
+    try:
+        dtype = numpy.dtype(descr)
+    except (TypeError, ValueError) as e:
+        raise TVBExtUnicoreException(f'Not a valid .npy dtype: {e}')
+    if dtype.hasobject:
+        return preview
+
+    total_items = math.prod(shape)
+    count = max(0, min(count, total_items - start))
+    data = remote_file.read_range(data_offset + start * dtype.itemsize, count * dtype.itemsize)
+    preview['values'] = _to_json_values(numpy.frombuffer(data, dtype=dtype).tolist())
+    preview['truncated'] = start > 0 or count < total_items
+    return preview
+
+
+def _hyperslab(shape, start, count):
+    """
+    Select about count elements at the beginning of every axis (from start on the first one), filling the
+    innermost axes first.
+    """
+    sizes = [1] * len(shape)
+    budget = count
+    for axis in reversed(range(len(shape))):
+        axis_start = start if axis == 0 else 0
+        sizes[axis] = max(1, min(shape[axis] - axis_start, budget))
+        budget = max(1, budget // sizes[axis])
+    return tuple(slice(start if axis == 0 else 0, (start if axis == 0 else 0) + size)
+                 for axis, size in enumerate(sizes))
+
+
+def preview_hdf5(remote_file, dataset=None, start=0, count=DEFAULT_PREVIEW_ITEMS):
+    # type: (RemoteFile, str, int, int) -> dict
+    """
+    Return the tree of groups and datasets of an HDF5 file and, if a dataset is given, a small hyperslab of it.
+    """
+    try:
+        import h5py
+    except ImportError:
+        raise TVBExtUnicoreException('h5py needs to be installed to preview HDF5 files!')
+
+    preview = {'type': 'hdf5', 'size': remote_file.size, 'tree': dict(), 'truncated': False}
+    try:
+        h5_file = h5py.File(remote_file, 'r')
+    except OSError as e:
+        raise TVBExtUnicoreException(f'Not a valid HDF5 file: {e}')
+
+    with h5_file:
+        def add_node(name, node):
+            if len(preview['tree']) >= MAX_HDF5_TREE_NODES:
+                preview['truncated'] = True
+                # Any value other than None stops the walk, so the remaining object headers are not fetched
+                return True
+            if isinstance(node, h5py.Dataset):
+                preview['tree'][name] = {'kind': 'dataset', 'shape': list(node.shape), 'dtype': str(node.dtype)}
+            else:
+                preview['tree'][name] = {'kind': 'group'}
+
+        h5_file.visititems(add_node)
+
+        if dataset is not None:
+            if dataset not in h5_file or not isinstance(h5_file[dataset], h5py.Dataset):
+                raise TVBExtUnicoreException(f'{dataset} is not a dataset of this file!')
+            node = h5_file[dataset]
+            selection = _hyperslab(node.shape, start, count) if node.shape else ()
+            values = node[selection]
+            preview['dataset'] = dataset
+            preview['selection'] = [[axis.start, axis.stop] for axis in selection]
+            preview['values'] = _to_json_values(values.tolist() if hasattr(values, 'tolist') else values)
+    return preview
+
+
+def preview_file(remote_file, file_name, dataset=None, start=0, count=DEFAULT_PREVIEW_ITEMS,
+                 lines=DEFAULT_PREVIEW_LINES, tail=False):
+    # type: (RemoteFile, str, str, int, int, int, bool) -> dict
+    """
+    Build the preview of a job output, based on its extension.
+    At most MAX_PREVIEW_ITEMS elements (or lines) are returned, whatever the requested count.
+    """
+    if start < 0 or count < 0 or lines < 0:
+        raise TVBExtUnicoreException('start, count and lines cannot be negative!')
+    count, lines = min(count, MAX_PREVIEW_ITEMS), min(lines, MAX_PREVIEW_ITEMS)
+
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension in NPY_EXTENSIONS:
+        return preview_npy(remote_file, start, count)
+    if extension in HDF5_EXTENSIONS:
+        return preview_hdf5(remote_file, dataset, start, count)
+    return preview_text(remote_file, lines, tail)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+#
+# "TheVirtualBrain - Widgets" package
+#
+# (c) 2022-2025, TVB Widgets Team
+#
+
+STATUS = 'status'
+STATUS_MESSAGE = 'statusMessage'
+SOURCE = 'source'
+TARGET = 'target'
+TRANSFERRED_BYTES = 'transferredBytes'
+SIZE = 'size'
+
+
+class TransferDTO(object):
+
+    def __init__(self, resource_url, source, target, status, status_message, transferred_bytes, size):
+        self.resource_url = resource_url
+        self.source = source
+        self.target = target
+        self.status = status
+        self.status_message = status_message
+        self.transferred_bytes = transferred_bytes or 0
+        self.size = size
+
+    def __str__(self):
+        return f"{type(self)}: source={self.source}, target={self.target}, status={self.status}, " \
+               f"transferred={self.transferred_bytes}/{self.size}, resource_url={self.resource_url}"
+
+    def to_json(self):
+        attrs = dict(vars(self))
+        attrs['progress'] = self.progress
+        attrs['is_running'] = self.is_running
+        return attrs
+
+    @property
+    def progress(self):
+        """
+        Transferred percentage, None while the size is unknown.
+        """
+        if not self.size or self.size < 0:
+            return 100 if self.status == 'DONE' else None
+        return round(100 * self.transferred_bytes / self.size, 1)
+
+    @property
+    def is_running(self):
+        finished_status = ['DONE', 'FAILED', 'ABORTED']
+        return self.status not in finished_status
+
+    @staticmethod
+    def from_unicore_transfer(transfer):
+        return TransferDTO(transfer.resource_url,
+                           transfer.properties.get(SOURCE),
+                           transfer.properties.get(TARGET),
+                           transfer.properties.get(STATUS),
+                           transfer.properties.get(STATUS_MESSAGE),
+                           transfer.properties.get(TRANSFERRED_BYTES),
+                           transfer.properties.get(SIZE))
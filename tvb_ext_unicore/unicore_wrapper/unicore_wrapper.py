@@ -6,18 +6,105 @@
 #
 import json
 import os
+import time
 import requests
 import pyunicore.client as unicore_client
 from pyunicore.credentials import OIDCToken
 from requests.exceptions import ConnectionError
 from tvb_ext_unicore.exceptions import TVBExtUnicoreException, ClientAuthException, SitesDownException
 from tvb_ext_unicore.exceptions import FileNotExistsException, JobRunningException
-from tvb_ext_unicore.logger.builder import get_logger
-from tvb_ext_unicore.unicore_wrapper.job_dto import JobDTO
+from tvb_ext_unicore.logger.builder import get_logger, get_correlation_id, SAMPLING_KEY, JOBS_POLLING, \
+    NO_CORRELATION_ID
+from tvb_ext_unicore.unicore_wrapper.concurrency import SITE_GOVERNOR
+from tvb_ext_unicore.unicore_wrapper.download_cache import DownloadCache, SIZE, LAST_MODIFIED
+from tvb_ext_unicore.unicore_wrapper.job_dto import JobDTO, STATUS, JOBS_PER_PAGE
+from tvb_ext_unicore.unicore_wrapper.preview import RemoteFile, preview_file
+from tvb_ext_unicore.unicore_wrapper.transfer_dto import TransferDTO
 from tvb_ext_unicore.utils import get_registry
 
 LOGGER = get_logger(__name__)
 DOWNLOAD_MESSAGE = 'Downloaded successfully!'
+CORRELATION_HEADER = 'X-Correlation-ID'
+CONNECTION_POOL_SIZE = 16
+
+
+class CorrelatedTransport(unicore_client.Transport):
+    """
+    Transport sending the correlation id of the current request along with every UNICORE call.
+    All the resources created from it share one pooled HTTP session, so concurrent calls reuse connections.
+    Every call waits for a slot of the adaptive concurrency limiter of its site.
+    """
+
+    def __init__(self, credential, session=None, **kwargs):
+        super().__init__(credential, **kwargs)
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=CONNECTION_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+
+    def _headers(self, kwargs):
+        headers = super()._headers(kwargs)
+        correlation_id = get_correlation_id()
+        if correlation_id != NO_CORRELATION_ID:
+            headers[CORRELATION_HEADER] = correlation_id
+        return headers
+
+    def _clone(self):
+        transport = super()._clone()
+        transport.__class__ = self.__class__
+        transport.session = self.session
+        return transport
+
+    def run_method(self, method, **args):
+        limiter = SITE_GOVERNOR.limiter_for(args.get('url'))
+        limiter.acquire()
+        start = time.monotonic()
+        # (status_code, retry_after) of the call, stays None when the outcome says nothing about the site load
+        outcome = None
+        try:
+            res = super().run_method(method, **args)
+            outcome = res.status_code, None
+            return res
+        except requests.HTTPError as e:
+            status_code = e.response.status_code if e.response is not None else None
+            outcome = status_code, self.__retry_after(e.response)
+            raise
+        except requests.RequestException:
+            # No response at all
+            outcome = None, None
+            raise
+        finally:
+            if outcome is None:
+                limiter.discard()
+            else:
+                limiter.release(time.monotonic() - start, *outcome)
+
+    @staticmethod
+    def __retry_after(response):
+        try:
+            return float(response.headers['Retry-After'])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            # Missing header, or given as an HTTP date
+            return None
+
+    def get(self, to_json=True, **kwargs):
+        res = self.run_method(self.session.get, **kwargs)
+        if not to_json:
+            return res
+        json_content = res.json()
+        res.close()
+        return json_content
+
+    def put(self, **kwargs):
+        return self.run_method(self.session.put, **kwargs)
+
+    def post(self, **kwargs):
+        return self.run_method(self.session.post, **kwargs)
+
+    def delete(self, **kwargs):
+        self.run_method(self.session.delete, **kwargs).close()
 
 
 class UnicoreWrapper(object):
@@ -27,6 +114,7 @@ class UnicoreWrapper(object):
         token = OIDCToken(token)
         self.transport = self.__build_transport(token)
         self.registry = unicore_client.Registry(self.transport, get_registry())
+        self.download_cache = DownloadCache()
 
     def __retrieve_token_str(self):
         try:
@@ -57,7 +145,7 @@ class UnicoreWrapper(object):
 
     def __build_transport(self, token):
         # type: (str) -> unicore_client.Transport
-        transport = unicore_client.Transport(token)
+        transport = CorrelatedTransport(token)
         return transport
 
     def __build_client(self, site):
@@ -76,6 +164,25 @@ class UnicoreWrapper(object):
 
         return client
 
+    def __download_path_file(self, job_url, file_name, path_file, path):
+        # type: (str, str, unicore_client.PathFile, str) -> None
+        """
+        Download a single job output file, going through the local download cache when possible.
+        """
+        try:
+            size = path_file.properties[SIZE]
+            cache_key = self.download_cache.build_key(job_url, file_name, size, path_file.properties[LAST_MODIFIED])
+        except Exception as e:
+            LOGGER.warning(f"Cannot determine the signature of {file_name}, the download cache is skipped: {e}")
+            path_file.download(path)
+            return
+
+        if self.download_cache.get(cache_key, path, size):
+            return
+
+        path_file.download(path)
+        self.download_cache.put(cache_key, path)
+
     def get_sites(self):
         # type: () -> dict[str, str]
         """
@@ -93,20 +200,19 @@ class UnicoreWrapper(object):
         """
         Retrieve the jobs started by the current user at the selected site and return them in a list.
         """
-        jobs_per_page = 10
-        jobs_offset = page * jobs_per_page
+        jobs_offset = page * JOBS_PER_PAGE
 
         jobs_list = list()
 
         try:
-            LOGGER.info(f"Getting jobs at site: {site}")
+            LOGGER.info(f"Getting jobs at site: {site}", extra={SAMPLING_KEY: JOBS_POLLING})
             client = self.__build_client(site)
         except ClientAuthException:
             return jobs_list, f"You do not have access to {site}"
         except SitesDownException as e:
             return jobs_list, e.message
 
-        all_jobs = client.get_jobs(offset=jobs_offset, num=jobs_per_page)
+        all_jobs = client.get_jobs(offset=jobs_offset, num=JOBS_PER_PAGE)
 
         for job in all_jobs:
             jobs_list.append(JobDTO.from_unicore_job(job))
@@ -140,6 +246,13 @@ class UnicoreWrapper(object):
         job = unicore_client.Job(self.transport, job_url)
         return job
 
+    def get_job_status(self, job_url):
+        # type: (str) -> str
+        """
+        Retrieve the current status of the job at the given URL, bypassing the pyunicore properties cache.
+        """
+        return self.transport.get(url=job_url)[STATUS]
+
     def get_job_output(self, job_url):
         # type: (str) -> dict
         """
@@ -178,7 +291,7 @@ class UnicoreWrapper(object):
                 raise FileNotExistsException(f'{file_name} does not exist as output of {job_url}!')
 
         if isinstance(wd[file_name], unicore_client.PathFile):
-            wd[file_name].download(path)
+            self.__download_path_file(job_url, file_name, wd[file_name], path)
             return DOWNLOAD_MESSAGE
 
         # In case the file to download is a directory:
@@ -190,9 +303,78 @@ class UnicoreWrapper(object):
 
         for fname, fpath in results_content.items():
             if isinstance(fpath, unicore_client.PathFile):
-                fpath.download(os.path.join(path, os.path.basename(fname)))
+                self.__download_path_file(job_url, fname, fpath, os.path.join(path, os.path.basename(fname)))
         return DOWNLOAD_MESSAGE
 
+    def get_storages(self, site):
+        # type: (str) -> dict[str, str]
+        """
+        Retrieve the storages of the given site, which can be used as targets of server-to-server transfers.
+        returns: {<storage_name>: <storage_url>}
+        """
+        client = self.__build_client(site)
+        return {os.path.basename(storage.resource_url): storage.resource_url for storage in client.get_storages()}
+
+    def start_transfers(self, job_url, file_names, target_url, protocol=None):
+        # type: (str, list, str, str) -> (list[TransferDTO], dict[str, str])
+        """
+        Start UNICORE server-to-server transfers of the given job outputs to a remote location, so that the data
+        never goes through the Jupyter server. A file whose transfer cannot be started does not prevent the others.
+        :param target_url: destination folder, as https://.../rest/core/storages/<NAME>/files/<path>
+        :param protocol: optional transfer protocol (e.g. UFTP), the site default is used otherwise
+        returns: the started transfers and {<file_name>: <error message>} for the files that failed
+        """
+        job = self.get_job(job_url)
+        if job.is_running():
+            raise JobRunningException('Cannot transfer files while the job is still running!')
+
+        # Validate the whole batch before starting any transfer
+        wd = job.working_dir.listdir()
+        for file_name in file_names:
+            if not wd.get(file_name, False) and not wd.get(file_name + '/', False):
+                raise FileNotExistsException(f'{file_name} does not exist as output of {job_url}!')
+
+        transfers = list()
+        errors = dict()
+        for file_name in file_names:
+            remote_url = f"{target_url.rstrip('/')}/{os.path.basename(file_name.rstrip('/'))}"
+            LOGGER.info(f"Starting server-to-server transfer of {file_name} from {job_url} to {remote_url}")
+            try:
+                transfer = job.working_dir.send_file(file_name, remote_url, protocol=protocol)
+                transfers.append(TransferDTO.from_unicore_transfer(transfer))
+            except Exception as e:
+                LOGGER.warning(f"Could not start the transfer of {file_name}: {e}")
+                errors[file_name] = f'Could not start the transfer of {file_name}: {e}'
+        return transfers, errors
+
+    def get_transfer(self, transfer_url):
+        # type: (str) -> TransferDTO
+        """
+        Retrieve the status and progress of the server-to-server transfer at the given URL.
+        """
+        transfer = unicore_client.Transfer(self.transport, transfer_url)
+        try:
+            return TransferDTO.from_unicore_transfer(transfer)
+        except requests.RequestException as e:
+            LOGGER.warning(f"Cannot retrieve transfer at URL {transfer_url}: {e}")
+            raise TVBExtUnicoreException(f'Transfer at {transfer_url} is not available!')
+
+    def abort_transfer(self, transfer_url):
+        # type: (str) -> TransferDTO
+        """
+        Abort the server-to-server transfer at the given URL, if it is still running.
+        """
+        transfer = unicore_client.Transfer(self.transport, transfer_url)
+        try:
+            # pyunicore considers ABORTED transfers as running, which have no abort action anymore
+            if TransferDTO.from_unicore_transfer(transfer).is_running:
+                transfer.abort()
+                LOGGER.info(f"Aborted transfer at URL: {transfer_url}")
+        except requests.RequestException as e:
+            LOGGER.warning(f"Cannot abort transfer at URL {transfer_url}: {e}")
+            raise TVBExtUnicoreException(f'Transfer at {transfer_url} is not available!')
+        return self.get_transfer(transfer_url)
+
     def stream_file(self, job_url, file, offset=0, size=-1):
         # type: (str, str, int, int) -> stream
         """
@@ -207,3 +389,22 @@ class UnicoreWrapper(object):
             raise FileNotExistsException(f'{file} does not exist as output of {job_url}!')
 
         return wd[file].raw(offset=offset, size=size)
+
+    def preview_file(self, job_url, file_name, **preview_params):
+        # type: (str, str, ...) -> dict
+        """
+        Preview a job output without downloading it, by reading only the needed parts of the file.
+        See preview.preview_file for the supported parameters.
+        """
+        job = self.get_job(job_url)
+        if job.is_running():
+            raise JobRunningException('Cannot preview file while the job is still running!')
+
+        wd = job.working_dir.listdir()
+        if not isinstance(wd.get(file_name), unicore_client.PathFile):
+            raise FileNotExistsException(f'{file_name} does not exist as output of {job_url}!')
+
+        path_file = wd[file_name]
+        size = path_file.properties[SIZE]
+        cache_key = self.download_cache.build_key(job_url, file_name, size, path_file.properties[LAST_MODIFIED])
+        return preview_file(RemoteFile(path_file, cache_key, size), file_name, **preview_params)
@@ -11,7 +11,6 @@ import os
 
 from jupyter_core.paths import jupyter_config_dir
 from tvb_ext_unicore.logger.builder import get_logger
-from pyunicore.client import _HBP_REGISTRY_URL
 
 LOGGER = get_logger(__name__)
 
@@ -39,6 +38,7 @@ def get_user_settings():
 
 
 def get_registry():
+    from pyunicore.client import _HBP_REGISTRY_URL
     user_settings = get_user_settings()
     registry = user_settings.get('registry', _HBP_REGISTRY_URL)  # if registry is not set, use a default value
     return registry